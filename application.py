@@ -1,35 +1,42 @@
-import joblib
-import numpy as np
-from config.paths_config import MODEL_OUTPUT_PATH
-from flask import Flask, render_template, request
+import os
+import time
+_import_started = time.perf_counter() #Start of the cold start reported by /ready
+from flask import Flask, render_template, request, jsonify
+from src.serving import ModelServer
 
 app = Flask(__name__)
-loaded_model = joblib.load(MODEL_OUTPUT_PATH)
+serving = ModelServer(started=_import_started) #Follows the model registry, swapping to newly promoted versions
 
 @app.route('/',methods= ['GET','POST'])
 def index():
     if request.method == 'POST':
-       lead_time = int(request.form["lead_time"])
-       no_of_special_request = int(request.form["no_of_special_request"])
-       avg_price_per_room=float(request.form["avg_price_per_room"])
-       arrival_month = int(request.form["arrival_month"])
-       arrival_date = int(request.form["arrival_date"])
-       market_segment_type = int(request.form["market_segment_type"])
-       no_of_week_nights = int(request.form["no_of_week_nights"])
-       no_of_weekend_nights = int(request.form["no_of_weekend_nights"])
-       type_of_meal_plan = int(request.form["type_of_meal_plan"])
-       room_type_reserved = int(request.form["room_type_reserved"]) 
-       feature = np.array([[lead_time, no_of_special_request, avg_price_per_room, arrival_month, arrival_date, market_segment_type, no_of_week_nights, no_of_weekend_nights, type_of_meal_plan, room_type_reserved]])
-       prediction = loaded_model.predict(feature)
-       return render_template('index.html', prediction= prediction[0])
+       try:
+           prediction = serving.predict_form(request.form)
+       except ValueError as e:
+           return render_template('index.html', prediction= None, error= str(e)), 400
+       return render_template('index.html', prediction= prediction)
     return render_template('index.html',prediction= None)
-if __name__ == '__main__':
-    #app.run(host='0.0.0.0', port=5000) 
-     port = int(os.environ.get("PORT", 8080))
-     app.run(host='0.0.0.0', port=port)
 
+@app.route('/predict', methods=['POST'])
+def predict():
+    payload = request.get_json(silent=True)
+    if payload is None:
+        return jsonify({"error": "Request body must be JSON"}), 400
+    try:
+        return jsonify(serving.predict_payload(payload))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    # The model is loaded and warmed before the app object exists, so a process that answers is ready
+    return jsonify(serving.ready())
 
-   
-       
-       
-       
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return jsonify(serving.metrics())
+
+if __name__ == '__main__':
+    #app.run(host='0.0.0.0', port=5000)
+     port = int(os.environ.get("PORT", 8080))
+     app.run(host='0.0.0.0', port=port, threaded=True)
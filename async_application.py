@@ -0,0 +1,133 @@
+import asyncio
+import os
+import time
+_import_started = time.perf_counter() #Start of the cold start reported by /ready
+from concurrent.futures import ThreadPoolExecutor
+from aiohttp import web
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from src.serving import ModelServer
+from src.micro_batcher import LatencyStats
+from src.logger import get_logger
+from config.serving_config import ASYNC_EXECUTOR_WORKERS, ASYNC_MAX_QUEUE, ASYNC_QUEUE_TIMEOUT_MS, ASYNC_MAX_BODY_MB
+
+logger = get_logger(__name__)
+
+# asyncio serving mode: python async_application.py, or
+# gunicorn async_application:create_app --worker-class aiohttp.GunicornWebWorker
+serving = ModelServer(started=_import_started)
+templates = Environment(loader=FileSystemLoader("templates"), autoescape=select_autoescape(["html"]))
+
+class Overloaded(Exception):
+    def __init__(self, status, reason):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+
+class AdmissionController:
+    # At most max_running model calls run on the executor and at most max_queue requests wait for a slot
+    def __init__(self, max_running, max_queue, queue_timeout_ms):
+        self.executor = ThreadPoolExecutor(max_workers=max_running, thread_name_prefix="predict")
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout_ms / 1000.0
+        self._slots = None
+        self.running = 0
+        self.waiting = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+        self.max_running = max_running
+
+    async def run(self, fn, *args):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_running) #Created inside the running loop
+        if self._slots.locked() and self.waiting >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise Overloaded(429, "Too many requests queued, retry later")
+        self.waiting += 1
+        # Not wait_for: on 3.11 it can acquire the slot and still raise TimeoutError, leaking the permit
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait([acquire], timeout=self.queue_timeout)
+        except asyncio.CancelledError:
+            self._abandon(acquire) #The client went away, possibly just after the slot was granted
+            raise
+        finally:
+            self.waiting -= 1
+        if not acquire.done():
+            self._abandon(acquire)
+            self.rejected["queue_timeout"] += 1
+            raise Overloaded(503, "Server overloaded, request waited too long for a model slot")
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, fn, *args)
+        finally:
+            self.running -= 1
+            self._slots.release()
+
+    def _abandon(self, acquire):
+        # Cancels a pending acquire; a slot it was granted anyway (before the cancellation lands) is handed back
+        acquire.cancel()
+        acquire.add_done_callback(lambda task: task.cancelled() or self._slots.release())
+
+    def metrics(self):
+        return {"running": self.running, "waiting": self.waiting, "max_running": self.max_running,
+                "max_queue": self.max_queue, "rejected": dict(self.rejected)}
+
+admission = AdmissionController(ASYNC_EXECUTOR_WORKERS, ASYNC_MAX_QUEUE, ASYNC_QUEUE_TIMEOUT_MS)
+endpoint_stats = {}
+
+@web.middleware
+async def latency_middleware(request, handler):
+    # Latency per endpoint, rejected requests included, so /metrics shows the tail under load
+    started = time.perf_counter()
+    try:
+        return await handler(request)
+    except Overloaded as e:
+        return web.json_response({"error": e.reason}, status=e.status, headers={"Retry-After": "1"})
+    finally:
+        resource = request.match_info.route.resource
+        stats = endpoint_stats.setdefault(f"{request.method} {resource.canonical if resource else 'unmatched'}", LatencyStats())
+        stats.record_batch(1, [(time.perf_counter() - started) * 1000.0])
+
+def render(status=200, **context):
+    return web.Response(text=templates.get_template("index.html").render(**context), content_type="text/html", status=status)
+
+async def index(request):
+    if request.method == "POST":
+        form = await request.post() #Read without blocking, a slow client only holds its own coroutine
+        try:
+            prediction = await admission.run(serving.predict_form, dict(form))
+        except ValueError as e:
+            return render(400, prediction=None, error=str(e))
+        return render(prediction=prediction)
+    return render(prediction=None)
+
+async def predict(request):
+    try:
+        payload = await request.json()
+    except ValueError:
+        return web.json_response({"error": "Request body must be JSON"}, status=400)
+    try:
+        return web.json_response(await admission.run(serving.predict_payload, payload))
+    except ValueError as e:
+        return web.json_response({"error": str(e)}, status=400)
+
+async def ready(request):
+    return web.json_response(serving.ready())
+
+async def metrics(request):
+    return web.json_response({
+        **serving.metrics(),
+        "admission": admission.metrics(),
+        "endpoints": {name: stats.snapshot() for name, stats in endpoint_stats.items()}
+    })
+
+def create_app():
+    app = web.Application(middlewares=[latency_middleware], client_max_size=int(ASYNC_MAX_BODY_MB * 1024 * 1024))
+    app.router.add_route("GET", "/", index)
+    app.router.add_route("POST", "/", index)
+    app.router.add_post("/predict", predict)
+    app.router.add_get("/ready", ready)
+    app.router.add_get("/metrics", metrics)
+    return app
+
+if __name__ == "__main__":
+    web.run_app(create_app(), host="0.0.0.0", port=int(os.environ.get("PORT", 8080)))
@@ -0,0 +1,63 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from config.serving_config import COLD_START_BUDGET_SECONDS
+
+RESULTS_DIR = "benchmarks/results"
+
+# Runs in a fresh interpreter: import the app (model load + warm-up), then the first requests a probe and a client send
+PROBE = """
+import json, time
+started = time.perf_counter()
+import application
+imported = time.perf_counter()
+client = application.app.test_client()
+assert client.get('/ready').status_code == 200
+ready = time.perf_counter()
+response = client.post('/predict', json=[application.serving.current.predictor.sample_record()])
+assert response.status_code == 200, response.get_data(as_text=True)
+done = time.perf_counter()
+print(json.dumps({"import_seconds": imported - started, "ready_ms": (ready - imported) * 1000,
+                  "first_predict_ms": (done - ready) * 1000, "model": application.serving.current.startup["model"]}))
+"""
+
+def measure_once(env):
+    started = time.perf_counter()
+    completed = subprocess.run([sys.executable, "-c", PROBE], env=env, capture_output=True, text=True)
+    total = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"Cold start probe failed:\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = total #Interpreter start to first prediction, what a scale-from-zero request waits for
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serving cold start in fresh processes and check it against the budget")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=COLD_START_BUDGET_SECONDS, help="Seconds allowed for the median cold start")
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [os.getcwd(), os.environ.get("PYTHONPATH")]))}
+    runs = [measure_once(env) for _ in range(args.runs)]
+    summary = {key: round(statistics.median(run[key] for run in runs), 4) for key in ("process_seconds", "import_seconds", "ready_ms", "first_predict_ms")}
+    results = {"created_at": datetime.now().isoformat(timespec="seconds"), "model": runs[0]["model"], "budget_seconds": args.budget,
+               "median": summary, "runs": runs}
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"cold_start_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Cold start ({results['model']}, median of {args.runs}): " + ", ".join(f"{k}={v}" for k, v in summary.items()))
+    print(f"Results saved to {result_path}")
+    if summary["process_seconds"] > args.budget:
+        print(f"Cold start {summary['process_seconds']}s is above the {args.budget}s budget")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+import numpy as np
+import mlflow
+from benchmarks.synthetic_data import write_bookings
+from utils.mlflow_logger import AsyncMLflowLogger
+
+RESULTS_DIR = "benchmarks/results"
+
+# The logging ModelTraining.run does, against a throw-away local store (SQLite runs, artifacts in a directory): two dataset
+# uploads before training, the model upload, the params and a few hundred metrics after it. Measured once inline
+# (synchronous, the old behaviour), once in the background and once more in the background with the datasets unchanged
+
+def busy_training(seconds):
+    # Stand-in for model training: numpy work on the main thread for the given time
+    deadline = time.perf_counter() + seconds
+    a = np.random.default_rng(0).random((300, 300))
+    while time.perf_counter() < deadline:
+        a = np.tanh(a @ a.T / 300)
+
+def add_latency(client, seconds):
+    # Stand-in for a remote tracking server / artifact store: every client call pays one round trip
+    for name in ("log_batch", "log_artifact", "list_artifacts"):
+        call = getattr(client, name)
+        setattr(client, name, lambda *args, _call=call, **kwargs: (time.sleep(seconds), _call(*args, **kwargs))[1])
+
+def log_run(experiment_id, tracking_uri, index_path, files, train_seconds, synchronous, latency_ms=0):
+    started = time.perf_counter()
+    with mlflow.start_run(experiment_id=experiment_id) as run:
+        with AsyncMLflowLogger(run.info.run_id, tracking_uri=tracking_uri, synchronous=synchronous, index_path=index_path) as tracker:
+            if latency_ms:
+                add_latency(tracker.client, latency_ms / 1000.0)
+            tracker.log_artifact(files["train"], artifact_path="artifacts")
+            tracker.log_artifact(files["test"], artifact_path="artifacts")
+            busy_training(train_seconds)
+            tracker.log_artifact(files["model"])
+            tracker.log_params({f"param_{i}": i for i in range(40)})
+            tracker.log_metrics({f"metric_{i}": i / 10 for i in range(300)})
+    stats = dict(tracker.stats)
+    return {
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "logging_blocked_seconds": round(stats["blocked_seconds"], 3),
+        "logging_work_seconds": round(stats["background_seconds"], 3),
+        "artifacts_uploaded": stats["artifacts_uploaded"],
+        "artifacts_deduplicated": stats["artifacts_deduplicated"],
+        "batches": stats["batches"],
+        "errors": stats["errors"]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time spent blocked on MLflow logging, inline vs background, on a local tracking store")
+    parser.add_argument("--rows", type=int, default=500000, help="Rows of the synthetic train dataset (test gets a quarter)")
+    parser.add_argument("--train-seconds", type=float, default=2.0, help="Simulated training time the uploads can overlap with")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Round trip added to every tracking call, 0 for the plain local store")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tracking_uri = f"sqlite:///{os.path.join(workdir, 'mlflow.db')}"
+        mlflow.set_tracking_uri(tracking_uri)
+        experiment_id = mlflow.create_experiment("mlflow_logging_benchmark", artifact_location=os.path.join(workdir, "mlartifacts"))
+        files = {"train": os.path.join(workdir, "train.csv"), "test": os.path.join(workdir, "test.csv"), "model": os.path.join(workdir, "model.pkl")}
+        write_bookings(files["train"], args.rows)
+        write_bookings(files["test"], args.rows // 4, seed=7)
+        with open(files["model"], "wb") as f:
+            f.write(os.urandom(5 * 2**20))
+
+        results = {"created_at": datetime.now().isoformat(timespec="seconds"), "rows": args.rows, "train_seconds": args.train_seconds,
+                   "latency_ms": args.latency_ms,
+                   "dataset_mb": round((os.path.getsize(files["train"]) + os.path.getsize(files["test"])) / 2**20, 1)}
+        sync_index, async_index = os.path.join(workdir, "sync_index.json"), os.path.join(workdir, "async_index.json")
+        results["synchronous"] = log_run(experiment_id, tracking_uri, sync_index, files, args.train_seconds, True, args.latency_ms)
+        results["background"] = log_run(experiment_id, tracking_uri, async_index, files, args.train_seconds, False, args.latency_ms)
+        results["background_unchanged_data"] = log_run(experiment_id, tracking_uri, async_index, files, args.train_seconds, False, args.latency_ms)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"mlflow_logging_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, "w") as f:
+        json.dump(results, f, indent=2)
+    for mode in ("synchronous", "background", "background_unchanged_data"):
+        print(f"{mode:>26}: " + ", ".join(f"{k}={v}" for k, v in results[mode].items()))
+    print(f"Results saved to {result_path}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime
+import numpy as np
+import joblib
+from sklearn.model_selection import train_test_split
+from config.paths_config import CONFIG_PATH, ARTIFACT_EXTENSION
+from config.model_params import HALVING_SEARCH_PARAMS
+from benchmarks.synthetic_data import generate_bookings, write_bookings
+from src.data_ingestion import DataIngestion
+from src.data_preprocessing import DataProcessor
+from src.model_training import ModelTraining
+from src.compiled_model import CompiledForest
+from src.prediction import BatchPredictor
+from src.logger import get_logger
+from utils.common_function import read_yaml, iter_data, ArtifactWriter
+from utils.profiler import profiler
+
+logger = get_logger(__name__)
+
+# The serving path hands LightGBM a plain array, which warns on every single-row call
+warnings.filterwarnings("ignore", message="X does not have valid feature names")
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+STREAMING_MIN_ROWS = 1_000_000 #From this size the data is written to disk and run through the streaming split and chunked preprocessing
+RESULTS_DIR = "benchmarks/results"
+BASELINE_PATH = os.path.join(RESULTS_DIR, "baseline.json")
+COMPARED_SUFFIXES = ("seconds", "_ms", "_mb", "_per_second") #Row counts and flags are not performance
+
+# Fixed, small search budget: the benchmark tracks the cost of the training code path, not the search size
+BENCHMARK_SEARCH_PARAMS = {**HALVING_SEARCH_PARAMS, 'n_candidates': 3, 'min_rounds': 50, 'max_rounds': 100, 'cv': 2}
+
+def time_call(fn, repeat=3):
+    # Best of N, the usual way to keep scheduler noise out of short timings
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+def benchmark_inference(model, transformer, raw_test, n_single, batch_size):
+    predictor = BatchPredictor(model, transformer)
+    latencies = []
+    for i in range(n_single):
+        row = raw_test.iloc[[i % len(raw_test)]]
+        started = time.perf_counter()
+        predictor.predict(predictor.validate(row)) #Same validate + predict path as the /predict endpoint
+        latencies.append(time.perf_counter() - started)
+    batch = raw_test.iloc[:batch_size]
+    batch_seconds, _ = time_call(lambda: predictor.predict(predictor.validate(batch)))
+    latencies = np.array(latencies) * 1000
+    return {
+        "single_p50_ms": round(float(np.percentile(latencies, 50)), 4),
+        "single_p99_ms": round(float(np.percentile(latencies, 99)), 4),
+        "batch_ms": round(batch_seconds * 1000, 4),
+        "batch_rows_per_second": round(len(batch) / batch_seconds, 1)
+    }
+
+def prepare_in_memory(processor, n_rows, seed):
+    with profiler.stage("generate", rows=n_rows):
+        df = generate_bookings(n_rows, seed=seed)
+    train_df, test_df = train_test_split(df, train_size=0.8, random_state=42)
+    raw_test = test_df.drop(columns=["Booking_ID", "booking_status"]).reset_index(drop=True)
+    del df
+    with profiler.stage("preprocessing", rows=len(train_df) + len(test_df)):
+        train_df = processor.preprocess_data(train_df, fit=True)
+        test_df = processor.preprocess_data(test_df)
+        train_df = processor.balance_data(train_df)
+        train_df = processor.select_features(train_df)
+    return train_df, test_df, raw_test
+
+def prepare_streaming(processor, n_rows, seed, work_dir, raw_test_rows):
+    # The paths the pipeline takes for data larger than RAM: the raw CSV is streamed to disk, split chunk by chunk on the
+    # Booking_ID hash (DataIngestion streaming mode) and preprocessed in two chunked passes (DataProcessor chunked mode)
+    raw_path = os.path.join(work_dir, "raw.csv")
+    train_path = os.path.join(work_dir, f"train{ARTIFACT_EXTENSION}")
+    test_path = os.path.join(work_dir, f"test{ARTIFACT_EXTENSION}")
+    with profiler.stage("generate", rows=n_rows):
+        write_bookings(raw_path, n_rows, seed=seed)
+    ingestion = DataIngestion(read_yaml(CONFIG_PATH))
+    with profiler.stage("split", rows=n_rows):
+        with ArtifactWriter(train_path) as train_writer, ArtifactWriter(test_path) as test_writer:
+            for chunk in iter_data(raw_path, chunk_size=ingestion.chunk_size):
+                is_train = ingestion.is_train_row(chunk["Booking_ID"])
+                train_writer.write(chunk[is_train])
+                test_writer.write(chunk[~is_train])
+    os.remove(raw_path)
+    raw_test = next(iter_data(test_path, chunk_size=raw_test_rows)).drop(columns=["Booking_ID", "booking_status"]).reset_index(drop=True)
+    with profiler.stage("preprocessing", rows=n_rows):
+        train_df = processor.preprocess_chunked(train_path, os.path.join(work_dir, f"train_preprocessed{ARTIFACT_EXTENSION}"), fit=True)
+        test_df = processor.preprocess_chunked(test_path, os.path.join(work_dir, f"test_preprocessed{ARTIFACT_EXTENSION}"))
+        train_df = processor.balance_data(train_df)
+        train_df = processor.select_features(train_df)
+    return train_df, test_df, raw_test
+
+def run_size(label, n_rows, work_dir, n_single, batch_size, seed, streaming_min_rows=STREAMING_MIN_ROWS):
+    profiler.reset()
+    processor = DataProcessor(None, None, work_dir, CONFIG_PATH, preprocessor_path=os.path.join(work_dir, "preprocessor.json"))
+    processor.feature_selector.use_cache = False #Cached rankings would hide the cost being measured
+    streaming = n_rows >= streaming_min_rows
+    if streaming:
+        train_df, test_df, raw_test = prepare_streaming(processor, n_rows, seed, work_dir, max(n_single, batch_size))
+    else:
+        train_df, test_df, raw_test = prepare_in_memory(processor, n_rows, seed)
+    test_df = test_df[train_df.columns]
+    processor.transformer.set_selected_features(train_df.columns)
+
+    model_path = os.path.join(work_dir, "model.pkl")
+    compiled_dir = os.path.join(work_dir, "compiled")
+    trainer = ModelTraining(None, None, model_path, compiled_model_dir=compiled_dir, preprocessor_path=processor.preprocessor_path)
+    trainer.search_strategy = "halving"
+    trainer.halving_search_params = BENCHMARK_SEARCH_PARAMS
+    x_train, y_train = train_df.drop(columns=["booking_status"]), train_df["booking_status"]
+    x_test = test_df.drop(columns=["booking_status"])
+    with profiler.stage("training", rows=len(x_train)):
+        model = trainer.train_lgbm(x_train, y_train)
+    with profiler.stage("export"):
+        trainer.save_model(model, x_test)
+
+    results = profiler.metrics(prefix="stage")
+    results["streaming"] = streaming
+    pickle_seconds, pickled = time_call(lambda: joblib.load(model_path))
+    compiled_seconds, compiled = time_call(lambda: CompiledForest.load(compiled_dir))
+    results["load.pickle_ms"] = round(pickle_seconds * 1000, 4)
+    results["load.compiled_ms"] = round(compiled_seconds * 1000, 4)
+    for name, loaded in (("pickle", pickled), ("compiled", compiled)):
+        for key, value in benchmark_inference(loaded, processor.transformer, raw_test, n_single, batch_size).items():
+            results[f"predict.{name}.{key}"] = value
+    logger.info(f"Benchmark {label} completed")
+    return results
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(), "git_commit": commit}
+
+def compare(results, baseline, threshold):
+    # Lower is better, except throughput; a metric regresses when it is worse than the baseline by more than threshold
+    regressions, lines = [], []
+    for label, metrics in results["sizes"].items():
+        for key, value in metrics.items():
+            if not key.endswith(COMPARED_SUFFIXES):
+                continue
+            base = baseline.get("sizes", {}).get(label, {}).get(key)
+            if not base:
+                continue
+            change = base / value - 1 if key.endswith("_per_second") else value / base - 1
+            status = "REGRESSION" if change > threshold else "ok"
+            lines.append(f"{label:>5} {key:<55} {base:>12.4f} -> {value:>12.4f} ({change:+.1%}) {status}")
+            if status == "REGRESSION":
+                regressions.append((label, key, change))
+    return regressions, lines
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing, training, model loading and prediction on synthetic bookings")
+    parser.add_argument("--sizes", default="10k,100k", help=f"Comma separated sizes out of {list(SIZES)}")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--single-requests", type=int, default=200, help="Single-row predictions timed per model")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--streaming-min-rows", type=int, default=STREAMING_MIN_ROWS,
+                        help="Sizes from this row count are generated on disk and run through the streaming split and chunked preprocessing")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown against the baseline, 0.2 = 20%%")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    args = parser.parse_args()
+
+    labels = [s.strip().lower() for s in args.sizes.split(",")]
+    unknown = [s for s in labels if s not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes {unknown}, expected some of {list(SIZES)}")
+
+    results = {"created_at": datetime.now().isoformat(timespec="seconds"), "environment": environment(), "sizes": {}}
+    for label in labels:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results["sizes"][label] = run_size(label, SIZES[label], work_dir, args.single_requests, args.batch_size, args.seed, args.streaming_min_rows)
+        summary = results["sizes"][label]
+        print(f"{label}: preprocessing {summary['stage.preprocessing.wall_seconds']:.2f}s, training {summary['stage.training.wall_seconds']:.2f}s, "
+              f"single row p50 {summary['predict.compiled.single_p50_ms']:.2f} ms (compiled) / {summary['predict.pickle.single_p50_ms']:.2f} ms (pickle)")
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    result_path = os.path.join(RESULTS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(result_path, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {result_path}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}, run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("environment", {}).get("cpu_count") != results["environment"]["cpu_count"]:
+        print("Warning: baseline was recorded on a machine with a different CPU count")
+    regressions, lines = compare(results, baseline, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"{len(regressions)} metrics regressed by more than {args.threshold:.0%}")
+        return 1
+    print("No regressions against the baseline")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+from config.paths_config import CONFIG_PATH
+from utils.common_function import read_yaml, ArtifactWriter
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Category shares and numeric ranges follow the real HotelReservations.csv
+CATEGORY_SHARES = {
+    "type_of_meal_plan": {"Meal Plan 1": 0.7673, "Not Selected": 0.1414, "Meal Plan 2": 0.0911, "Meal Plan 3": 0.0002},
+    "room_type_reserved": {"Room_Type 1": 0.7755, "Room_Type 4": 0.167, "Room_Type 6": 0.0266, "Room_Type 2": 0.0191,
+                           "Room_Type 5": 0.0073, "Room_Type 7": 0.0044, "Room_Type 3": 0.0001},
+    "market_segment_type": {"Online": 0.6399, "Offline": 0.2902, "Corporate": 0.0556, "Complementary": 0.0109, "Aviation": 0.0034},
+}
+
+def _choice(rng, shares, n):
+    values = list(shares)
+    p = np.array(list(shares.values()))
+    return rng.choice(values, size=n, p=p / p.sum())
+
+def _generate_chunk(rng, start, n):
+    df = pd.DataFrame({
+        "Booking_ID": np.char.add("INN", np.char.zfill(np.arange(start + 1, start + n + 1).astype(str), 8)),
+        "no_of_adults": rng.choice([0, 1, 2, 3, 4], size=n, p=[0.004, 0.212, 0.72, 0.0638, 0.0002]),
+        "no_of_children": rng.choice([0, 1, 2, 3], size=n, p=[0.926, 0.045, 0.028, 0.001]),
+        "no_of_weekend_nights": np.minimum(rng.poisson(0.8, n), 7),
+        "no_of_week_nights": np.minimum(rng.poisson(2.2, n), 17),
+        "type_of_meal_plan": _choice(rng, CATEGORY_SHARES["type_of_meal_plan"], n),
+        "room_type_reserved": _choice(rng, CATEGORY_SHARES["room_type_reserved"], n),
+        "lead_time": np.minimum(rng.exponential(85, n).astype(np.int64), 443),
+        "arrival_year": rng.choice([2017, 2018], size=n, p=[0.18, 0.82]),
+        "arrival_month": rng.integers(1, 13, n),
+        "arrival_date": rng.integers(1, 32, n),
+        "market_segment_type": _choice(rng, CATEGORY_SHARES["market_segment_type"], n),
+        "repeated_guest": (rng.random(n) < 0.026).astype(np.int64),
+        "no_of_previous_cancellations": np.minimum(rng.poisson(0.02, n), 13),
+        "no_of_previous_bookings_not_canceled": np.minimum(rng.poisson(0.15, n), 58),
+        "avg_price_per_room": np.round(np.clip(rng.normal(103.4, 35, n), 0, 540), 2),
+        "no_of_special_requests": rng.choice([0, 1, 2, 3, 4, 5], size=n, p=[0.545, 0.314, 0.12, 0.019, 0.0019, 0.0001]),
+    })
+    # Cancellations depend on the features the real model relies on, so training has a signal to find
+    logit = (-1.7 + 0.011 * df["lead_time"] - 0.9 * df["no_of_special_requests"] + 0.008 * (df["avg_price_per_room"] - 100)
+             + 0.6 * (df["market_segment_type"] == "Online") - 2.0 * df["repeated_guest"])
+    canceled = rng.random(n) < 1 / (1 + np.exp(-logit.to_numpy()))
+    df["booking_status"] = np.where(canceled, "Canceled", "Not_Canceled")
+    return df
+
+def check_schema(df, config_path=CONFIG_PATH):
+    # The generator has to keep up with the columns config.yaml declares
+    config = read_yaml(config_path)["data_processing"]
+    expected = set(config["categorical_features"]) | set(config["numerical_features"])
+    missing = sorted(expected - set(df.columns))
+    if missing:
+        raise ValueError(f"Synthetic data is missing configured columns: {missing}")
+
+def generate_bookings(n_rows, seed=42, chunk_size=1000000):
+    # Each chunk has its own seeded generator, so the same n_rows and seed give the same data
+    chunks = [_generate_chunk(np.random.default_rng([seed, i]), start, min(chunk_size, n_rows - start))
+              for i, start in enumerate(range(0, n_rows, chunk_size))]
+    df = pd.concat(chunks, ignore_index=True)
+    check_schema(df)
+    return df
+
+def write_bookings(file_path, n_rows, seed=42, chunk_size=1000000):
+    # Streams chunks to disk, for sizes that should not be built in memory at once
+    with ArtifactWriter(file_path) as writer:
+        for i, start in enumerate(range(0, n_rows, chunk_size)):
+            chunk = _generate_chunk(np.random.default_rng([seed, i]), start, min(chunk_size, n_rows - start))
+            if i == 0:
+                check_schema(chunk)
+            writer.write(chunk)
+    logger.info(f"Wrote {writer.rows_written} synthetic bookings to {file_path}")
+    return file_path
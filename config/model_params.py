@@ -17,4 +17,64 @@ RANDOM_SEARCH_PARAMS = {
     'scoring': 'accuracy'
 }
 
-    
\ No newline at end of file
+    
+
+# "halving" runs SuccessiveHalvingSearch, "random" the RandomizedSearchCV above
+SEARCH_STRATEGY = 'halving'
+
+# Successive halving on boosting rounds: every rung keeps the best 1/eta candidates and gives them eta x more rounds
+HALVING_SEARCH_PARAMS = {
+    'n_candidates': 27,
+    'min_rounds': 50,
+    'max_rounds': 500,
+    'eta': 3,
+    'cv': 3,
+    'early_stopping_rounds': 20,
+    'early_stopping_fraction': 0.1, #Share of each training fold held out to pick the round count
+    'threads_per_worker': 2,
+    'n_workers': None,
+    'random_state': 42,
+    'scoring': 'accuracy'
+}
+
+# Incremental retraining: continue boosting the previous model on rows it has not seen yet.
+# A full retrain runs instead when the new rows drift (PSI), are too many, or the held-out metric drops.
+INCREMENTAL_PARAMS = {
+    'extra_rounds': 50,
+    'max_new_fraction': 0.5,
+    'max_psi': 0.2,
+    'max_degradation': 0.01,
+    'metric': 'accuracy'
+}
+
+# Evaluation: one predict_proba on the test set feeds the metrics, bootstrap intervals and per-segment metrics.
+# cv_folds > 0 also cross-validates the chosen model on the training set, folds in parallel
+EVALUATION_PARAMS = {
+    'threshold': 0.5,
+    'bootstrap_samples': 1000,
+    'confidence': 0.95,
+    'segment_column': 'market_segment_type',
+    'cv_folds': 3,
+    'n_jobs': -1,
+    'bootstrap_memory_mb': 256 #Caps the resample weight matrices, the batch size shrinks as the test set grows
+}
+
+# Model registry: every run registers a version. 'if_better' promotes it when `metric` is at least min_improvement
+# above the served version's and otherwise puts it on shadow traffic (shadow_rejected); 'always' / 'never' skip the check
+REGISTRY_PARAMS = {
+    'promote': 'if_better',
+    'metric': 'roc_auc',
+    'min_improvement': 0.0,
+    'shadow_rejected': True,
+    'keep_versions': 10
+}
+
+# MLflow logging off the training critical path: params / metrics / tags are sent in log_batch calls by a background
+# thread and artifacts upload on upload_workers threads; a file already uploaded with the same content (an unchanged
+# dataset) is referenced by a tag instead. synchronous=True logs inline, as before
+MLFLOW_LOGGING_PARAMS = {
+    'synchronous': False,
+    'upload_workers': 4,
+    'flush_interval': 1.0,
+    'dedupe_artifacts': True
+}
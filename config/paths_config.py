@@ -1,21 +1,57 @@
 import os
+import importlib.util
+
+########## ARTIFACT FORMAT ############
+# Format of the data handed between pipeline stages: "parquet", "feather" or "csv".
+# Parquet / Feather need pyarrow, without it the stages fall back to CSV.
+ARTIFACT_FORMAT = os.environ.get("ARTIFACT_FORMAT", "parquet").lower()
+if ARTIFACT_FORMAT != "csv" and importlib.util.find_spec("pyarrow") is None:
+    ARTIFACT_FORMAT = "csv"
+ARTIFACT_EXTENSION = {"parquet": ".parquet", "feather": ".feather", "csv": ".csv"}[ARTIFACT_FORMAT]
 
 ########## DATA INGESTION ############
 RAW_DIR = "artifacts/raw"
 RAW_FILE_PATH = os.path.join(RAW_DIR, "raw.csv")
-TRAIN_FILE_PATH = os.path.join(RAW_DIR, "train.csv")
-TEST_FILE_PATH = os.path.join(RAW_DIR, "test.csv")
+TRAIN_FILE_PATH = os.path.join(RAW_DIR, f"train{ARTIFACT_EXTENSION}")
+TEST_FILE_PATH = os.path.join(RAW_DIR, f"test{ARTIFACT_EXTENSION}")
 
 CONFIG_PATH = "config/config.yaml"
 
+########## STAGE CACHE ############
+CACHE_DIR = "artifacts/cache"
+FEATURE_RANKING_CACHE_PATH = os.path.join(CACHE_DIR, "feature_ranking.json")
+# Content hash -> first MLflow run that uploaded the file, to skip re-uploading unchanged datasets
+MLFLOW_UPLOAD_INDEX_PATH = os.path.join(CACHE_DIR, "mlflow_uploads.json")
+
 ########### DATA PROCESSING ############
 PROCESSED_DIR = "artifacts/processed"
 
 # Ensure the processed directory exists
 os.makedirs(PROCESSED_DIR, exist_ok=True)
 
-PROCESSED_TRAIN_PATH = os.path.join(PROCESSED_DIR, "processed_train.csv/train_processed.csv")
-PROCESSED_TEST_PATH = os.path.join(PROCESSED_DIR, "processed_test.csv/test_processed.csv")
+PROCESSED_TRAIN_PATH = os.path.join(PROCESSED_DIR, f"train_processed{ARTIFACT_EXTENSION}")
+PROCESSED_TEST_PATH = os.path.join(PROCESSED_DIR, f"test_processed{ARTIFACT_EXTENSION}")
+# Real training rows with the selected features, before SMOTE; the incremental training state tracks these, not the synthetic rows
+PROCESSED_REAL_TRAIN_PATH = os.path.join(PROCESSED_DIR, f"train_real{ARTIFACT_EXTENSION}")
+BALANCED_TRAIN_PATH = os.path.join(PROCESSED_DIR, f"balanced_train{ARTIFACT_EXTENSION}")
+# Written by the chunked preprocessing: encoded / transformed rows before balancing and feature selection
+PREPROCESSED_TRAIN_PATH = os.path.join(PROCESSED_DIR, f"train_preprocessed{ARTIFACT_EXTENSION}")
+PREPROCESSED_TEST_PATH = os.path.join(PROCESSED_DIR, f"test_preprocessed{ARTIFACT_EXTENSION}")
+# Transformer fitted by the processing stage; it only replaces the served one (PREPROCESSOR_PATH) together with the model trained behind it
+PROCESSED_PREPROCESSOR_PATH = os.path.join(PROCESSED_DIR, "preprocessor.json")
 
 ############# MODEL TRAINING###########
-MODEL_OUTPUT_PATH = "artifacts/models/lgbm_model.pkl" 
\ No newline at end of file
+# Served model: the registry publishes the promoted version here, a rejected candidate never lands in artifacts/models
+MODEL_OUTPUT_PATH = "artifacts/models/lgbm_model.pkl"
+COMPILED_MODEL_DIR = "artifacts/models/lgbm_compiled"
+PREPROCESSOR_PATH = "artifacts/models/preprocessor.json"
+TRAINING_STATE_PATH = "artifacts/models/training_state.json"
+# Model of the last training run, kept here until the registry has taken its copy
+CANDIDATE_DIR = "artifacts/candidate"
+CANDIDATE_MODEL_PATH = os.path.join(CANDIDATE_DIR, "lgbm_model.pkl")
+CANDIDATE_COMPILED_DIR = os.path.join(CANDIDATE_DIR, "lgbm_compiled")
+PROFILE_DIR = "artifacts/profiles"
+
+############# MODEL REGISTRY ###########
+# Versioned models (compiled arrays, pickle, preprocessor, metrics) and the CURRENT / SHADOW pointers the servers follow
+MODEL_REGISTRY_DIR = os.environ.get("MODEL_REGISTRY_DIR", "artifacts/registry")
@@ -0,0 +1,47 @@
+import os
+
+########## MODEL LOADING ############
+# Serve the numpy-only compiled trees when they exist instead of unpickling the LightGBM estimator
+USE_COMPILED_MODEL = os.environ.get("USE_COMPILED_MODEL", "true").lower() == "true"
+
+########## BATCH PREDICTION ############
+# Maximum number of records accepted by a single /predict call
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", 10000))
+
+########## MICRO-BATCHING ############
+# Concurrent single-row requests are coalesced for up to BATCH_WINDOW_MS or BATCH_MAX_ROWS rows
+MICRO_BATCHING = os.environ.get("MICRO_BATCHING", "true").lower() == "true"
+BATCH_WINDOW_MS = float(os.environ.get("BATCH_WINDOW_MS", 2))
+BATCH_MAX_ROWS = int(os.environ.get("BATCH_MAX_ROWS", 256))
+# Number of recent requests used for the latency / batch size percentiles
+METRICS_WINDOW = int(os.environ.get("METRICS_WINDOW", 10000))
+
+########## STARTUP ############
+# Time from importing application.py to a warmed-up model; startup logs a warning above it and
+# benchmarks/cold_start.py fails above it
+COLD_START_BUDGET_SECONDS = float(os.environ.get("COLD_START_BUDGET_SECONDS", 3.0))
+# Gunicorn workers forked from the preloaded master (gunicorn.conf.py) and threads per worker
+WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 2))
+GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 4))
+
+########## MODEL REGISTRY ############
+# Workers serve the registry's CURRENT version (artifacts/models when there is none) and check the CURRENT / SHADOW
+# pointers every MODEL_POLL_SECONDS (0 disables): a new version is loaded and warmed off the request path, then swapped in
+MODEL_POLL_SECONDS = float(os.environ.get("MODEL_POLL_SECONDS", 5))
+# Shadow scoring of the SHADOW version runs on one background thread; requests beyond this backlog are not shadowed
+SHADOW_MAX_PENDING = int(os.environ.get("SHADOW_MAX_PENDING", 1000))
+
+########## PREDICTION CACHE ############
+# Results for repeated feature vectors: "memory" (per worker), "sqlite" (shared by the workers on a host) or "off"
+PREDICTION_CACHE = os.environ.get("PREDICTION_CACHE", "memory").lower()
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 10000))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", 300))
+PREDICTION_CACHE_PATH = os.environ.get("PREDICTION_CACHE_PATH", "/tmp/prediction_cache.sqlite")
+
+########## ASYNC SERVER ############
+# async_application.py: model calls run on a bounded thread pool; requests beyond it wait in a bounded queue.
+# A full queue answers 429 at once, a request that waits longer than ASYNC_QUEUE_TIMEOUT_MS answers 503
+ASYNC_EXECUTOR_WORKERS = int(os.environ.get("ASYNC_EXECUTOR_WORKERS", os.cpu_count() or 1))
+ASYNC_MAX_QUEUE = int(os.environ.get("ASYNC_MAX_QUEUE", 64))
+ASYNC_QUEUE_TIMEOUT_MS = float(os.environ.get("ASYNC_QUEUE_TIMEOUT_MS", 1000))
+ASYNC_MAX_BODY_MB = float(os.environ.get("ASYNC_MAX_BODY_MB", 8))
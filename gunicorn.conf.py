@@ -0,0 +1,18 @@
+import gc
+import os
+from config.serving_config import WEB_CONCURRENCY, GUNICORN_THREADS
+
+# Serving entry point: gunicorn --config gunicorn.conf.py application:app
+bind = f"0.0.0.0:{os.environ.get('PORT', 8080)}"
+workers = WEB_CONCURRENCY
+threads = GUNICORN_THREADS
+worker_class = "gthread"
+# application.py (model load + warm-up) is imported once in the master; forked workers share those pages copy-on-write
+preload_app = True
+# Cloud Run enforces the request timeout itself
+timeout = 0
+
+def when_ready(server):
+    # Objects from the preloaded app move to the permanent generation, so garbage collection in the
+    # workers does not write to (and copy) the shared pages
+    gc.freeze()
@@ -0,0 +1,128 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from config.paths_config import MODEL_OUTPUT_PATH, COMPILED_MODEL_DIR, PREPROCESSOR_PATH, MODEL_REGISTRY_DIR, CONFIG_PATH
+from src.feature_transformer import FeatureTransformer
+from src.model_registry import ModelRegistry
+from src.serving import load_model
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from utils.common_function import iter_data, read_yaml, ArtifactWriter
+
+logger = get_logger(__name__)
+
+# Usage, from the repository root:
+#   python -m pipeline.batch_scoring bookings.csv predictions.parquet --workers 8
+
+# Model and transformer of each pool process, loaded once by the initializer instead of pickled with every chunk
+_WORKER = {}
+
+def _init_worker(use_compiled, paths, threads):
+    model, _ = load_model(use_compiled, paths["model"], paths["compiled"])
+    if hasattr(model, "set_params"):
+        model.set_params(n_jobs=threads) #One LightGBM thread per pool process, the pool provides the parallelism
+    _WORKER.update(model=model, transformer=FeatureTransformer.load(paths["preprocessor"]))
+
+def score_chunk(chunk, id_column=None):
+    # Same encoding / skew transforms and feature order as training; rows the model cannot score get -1 / NaN
+    model, transformer = _WORKER["model"], _WORKER["transformer"]
+    features = transformer.transform(chunk[transformer.selected_features])[list(model.feature_name_)]
+    features = features.apply(pd.to_numeric, errors="coerce")
+    valid = features.notna().all(axis=1).to_numpy().copy()
+    for col in transformer.category_maps:
+        if col in features.columns:
+            valid &= features[col].to_numpy() >= 0 #Unknown categories are encoded as -1
+
+    probabilities = np.full(len(chunk), np.nan)
+    if valid.any():
+        probabilities[valid] = model.predict_proba(features.to_numpy(dtype=np.float64)[valid])[:, 1]
+    result = pd.DataFrame({"prediction": np.where(valid, probabilities > 0.5, -1).astype(np.int8), "probability": probabilities})
+    if id_column is not None:
+        result.insert(0, id_column, chunk[id_column].to_numpy())
+    return result
+
+class BatchScorer:
+    def __init__(self, input_path, output_path, chunk_size=100000, workers=None, id_column="Booking_ID",
+                 use_compiled=False, version=None, registry=None, fail_on_invalid=False, read_dtypes=None):
+        self.input_path = input_path
+        self.output_path = output_path
+        self.chunk_size = chunk_size
+        self.workers = workers or os.cpu_count() or 1
+        self.id_column = id_column
+        # The compiled trees win on cold start, LightGBM's native predict on throughput for large chunks
+        self.use_compiled = use_compiled
+        self.registry = registry or ModelRegistry(MODEL_REGISTRY_DIR)
+        self.version, self.paths = self.resolve_model(version)
+        self.fail_on_invalid = fail_on_invalid
+        self.read_dtypes = read_dtypes if read_dtypes is not None else read_yaml(CONFIG_PATH)["batch_scoring"]["read_dtypes"]
+
+    def resolve_model(self, version=None):
+        # The registry's CURRENT version (or the one asked for) with the transformer it was trained behind
+        version = version or self.registry.current_version()
+        if version is None:
+            logger.warning(f"No promoted version in {self.registry.root}, scoring with the model in artifacts/models")
+            return None, {"model": MODEL_OUTPUT_PATH, "compiled": COMPILED_MODEL_DIR, "preprocessor": PREPROCESSOR_PATH}
+        self.registry.verify(version)
+        logger.info(f"Scoring with model version {version}")
+        return version, self.registry.paths(version)
+
+    def read_columns(self):
+        # Only the model's raw inputs (and the id) are parsed from the file
+        transformer = FeatureTransformer.load(self.paths["preprocessor"])
+        return transformer.selected_features + ([self.id_column] if self.id_column else [])
+
+    def _write(self, writer, result):
+        invalid = int((result["prediction"] == -1).sum())
+        if invalid and self.fail_on_invalid:
+            raise ValueError(f"{invalid} rows have missing, non-numeric or unknown feature values")
+        writer.write(result)
+        return invalid
+
+    def run(self):
+        try:
+            started = time.perf_counter()
+            chunks = iter_data(self.input_path, chunk_size=self.chunk_size, columns=self.read_columns(), dtype=self.read_dtypes)
+            invalid = 0
+            logger.info(f"Scoring {self.input_path} in chunks of {self.chunk_size} rows with {self.workers} workers")
+            with ArtifactWriter(self.output_path) as writer:
+                if self.workers == 1:
+                    _init_worker(self.use_compiled, self.paths, -1)
+                    for chunk in chunks:
+                        invalid += self._write(writer, score_chunk(chunk, self.id_column))
+                else:
+                    with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                             initargs=(self.use_compiled, self.paths, 1)) as executor:
+                        # At most two chunks per worker are in flight, results are written in input order
+                        pending = deque()
+                        for chunk in chunks:
+                            pending.append(executor.submit(score_chunk, chunk, self.id_column))
+                            if len(pending) >= 2 * self.workers:
+                                invalid += self._write(writer, pending.popleft().result())
+                        while pending:
+                            invalid += self._write(writer, pending.popleft().result())
+            elapsed = time.perf_counter() - started
+            logger.info(f"Scored {writer.rows_written} rows in {elapsed:.1f}s ({writer.rows_written / max(elapsed, 1e-9):.0f} rows/s), {invalid} invalid")
+            return {"rows": writer.rows_written, "invalid_rows": invalid, "seconds": round(elapsed, 2), "model_version": self.version}
+        except Exception as e:
+            logger.error(f"Error while batch scoring {self.input_path}: {e}")
+            raise CustomException("Failed to batch score the input file", e)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog="python -m pipeline.batch_scoring",
+                                     description="Score a raw reservations CSV/Parquet file in chunks across a process pool")
+    parser.add_argument("input", help="Raw reservations file (.csv, .parquet or .feather)")
+    parser.add_argument("output", help="Where predictions are written; the extension picks the format")
+    parser.add_argument("--chunk-size", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=None, help="Scoring processes, defaults to the CPU count")
+    parser.add_argument("--id-column", default="Booking_ID", help="Column copied to the output next to each prediction, '' for none")
+    parser.add_argument("--version", default=None, help="Registry version to score with, defaults to CURRENT")
+    parser.add_argument("--compiled", action="store_true", help="Score with the numpy compiled trees instead of the LightGBM pickle")
+    parser.add_argument("--fail-on-invalid", action="store_true", help="Stop instead of writing -1 for rows that cannot be scored")
+    args = parser.parse_args()
+    summary = BatchScorer(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers, id_column=args.id_column or None,
+                          use_compiled=args.compiled, version=args.version, fail_on_invalid=args.fail_on_invalid).run()
+    print(summary)
@@ -1,18 +1,63 @@
+import argparse
+import os
+from datetime import datetime
 from src.data_ingestion import DataIngestion
 from src.data_preprocessing import DataProcessor
 from src.model_training import ModelTraining
 from utils.common_function import read_yaml
+from utils.stage_cache import StageCache
+from utils.profiler import profiler
 from config.paths_config import *
-if __name__ == 'main':
+
+# Source files whose changes invalidate a stage's cached outputs
+COMMON_CODE = ["utils/common_function.py", "config/paths_config.py"]
+INGESTION_CODE = ["src/data_ingestion.py", "src/gcs_downloader.py"] + COMMON_CODE
+PROCESSING_CODE = ["src/data_preprocessing.py", "src/feature_transformer.py", "src/chunked_preprocessing.py", "src/feature_selection.py", "src/balancing.py"] + COMMON_CODE
+TRAINING_CODE = ["src/model_training.py", "src/hyperparameter_search.py", "src/incremental_training.py", "src/model_evaluation.py", "src/model_registry.py", "src/compiled_model.py", "src/balancing.py", "utils/mlflow_logger.py", "config/model_params.py"] + COMMON_CODE
+
+def run_pipeline(force=False, incremental=False):
+    config = read_yaml(CONFIG_PATH)
+    cache = StageCache(CACHE_DIR, **config["stage_cache"])
+    profiler.configure(**config["profiling"])
+
     #Data ingestion
-    data_ingestion = DataIngestion(config=read_yaml(CONFIG_PATH))
-    data_ingestion.run()
-    
+    data_ingestion = DataIngestion(config=config)
+    with profiler.stage("data_ingestion") as record:
+        record["cached"] = not cache.run_stage(
+            "data_ingestion", data_ingestion.run,
+            inputs=[], outputs=data_ingestion.outputs(), #No raw.csv when streaming straight from the bucket
+            config={**config["data_ingestion"], "source_version": data_ingestion.get_source_version()},
+            code_files=INGESTION_CODE, force=force
+        )
+
     #Data processing
     processor = DataProcessor(TRAIN_FILE_PATH, TEST_FILE_PATH, PROCESSED_DIR, CONFIG_PATH)
-    processor.process()
-    
+    with profiler.stage("data_processing") as record:
+        record["cached"] = not cache.run_stage(
+            "data_processing", processor.process,
+            inputs=[TRAIN_FILE_PATH, TEST_FILE_PATH], outputs=[PROCESSED_TRAIN_PATH, PROCESSED_TEST_PATH, PROCESSED_REAL_TRAIN_PATH, PROCESSED_PREPROCESSOR_PATH],
+            config=config["data_processing"], code_files=PROCESSING_CODE, force=force
+        )
+
     #Model training
-    model_training = ModelTraining(PROCESSED_TRAIN_PATH, PROCESSED_TEST_PATH, MODEL_OUTPUT_PATH)
-    model_training.run()
-    
\ No newline at end of file
+    # Only the candidate is a stage output: artifacts/models and the training state follow registry promotions, not the cache
+    model_training = ModelTraining(PROCESSED_TRAIN_PATH, PROCESSED_TEST_PATH, CANDIDATE_MODEL_PATH, CANDIDATE_COMPILED_DIR, incremental=incremental)
+    with profiler.stage("model_training") as record:
+        record["cached"] = not cache.run_stage(
+            "model_training", model_training.run,
+            inputs=[PROCESSED_TRAIN_PATH, PROCESSED_TEST_PATH, PROCESSED_REAL_TRAIN_PATH, PROCESSED_PREPROCESSOR_PATH], outputs=[CANDIDATE_MODEL_PATH, CANDIDATE_COMPILED_DIR],
+            config={"incremental": incremental, "balancing": config["data_processing"]["balancing"]}, code_files=TRAINING_CODE, force=force
+        )
+
+    #Profile of this run, compared run over run in MLflow
+    if profiler.enabled:
+        profiler.save(os.path.join(PROFILE_DIR, f"pipeline_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"))
+        if config["profiling"]["log_to_mlflow"]:
+            profiler.log_to_mlflow(run_id=model_training.run_id) #Same run as the training metrics when training ran
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the training pipeline, reusing cached stages whose inputs did not change")
+    parser.add_argument("--force", action="store_true", help="Re-run every stage even if its fingerprint is unchanged")
+    parser.add_argument("--incremental", action="store_true", help="Continue boosting the previous model on new rows instead of retraining from scratch")
+    args = parser.parse_args()
+    run_pipeline(force=args.force, incremental=args.incremental)
@@ -0,0 +1,81 @@
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from sklearn.neighbors import NearestNeighbors
+from src.logger import get_logger
+from utils.common_function import downcast_dtypes
+
+logger = get_logger(__name__)
+
+class ChunkedSMOTE:
+    def __init__(self, k_neighbors=5, chunk_size=50000, n_jobs=-1, random_state=42, measure_memory=False):
+        self.k_neighbors = k_neighbors
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.measure_memory = measure_memory #tracemalloc slows every allocation down, so peak memory is only traced on request
+        self.stats = {}
+
+    def minority_neighbors(self, x_class):
+        # One neighbour index per class, queried once; every synthetic chunk reuses the same neighbour table
+        if len(x_class) < 2:
+            return np.zeros((len(x_class), 1), dtype=np.int32) #A lone sample is its own neighbour, its synthetic rows are copies of it
+        k = min(self.k_neighbors, len(x_class) - 1)
+        index = NearestNeighbors(n_neighbors=k + 1, n_jobs=self.n_jobs).fit(x_class)
+        return index.kneighbors(x_class, return_distance=False)[:, 1:].astype(np.int32)
+
+    def fit_resample(self, x, y):
+        started = time.perf_counter()
+        trace = self.measure_memory and not tracemalloc.is_tracing() #An outer profiler's tracing session is left running
+        if trace:
+            tracemalloc.start()
+        try:
+            x = downcast_dtypes(x)
+            y = y.reset_index(drop=True)
+            classes, counts = np.unique(y.to_numpy(), return_counts=True)
+            target_count = counts.max()
+            n_synthetic = int((target_count - counts).sum())
+
+            # Output columns are allocated once in their downcast dtypes and filled in place: originals first, then synthetic rows chunk by chunk
+            columns = {}
+            for col in x.columns:
+                columns[col] = np.empty(len(x) + n_synthetic, dtype=x[col].dtype)
+                columns[col][:len(x)] = x[col].to_numpy()
+            labels = np.empty(len(x) + n_synthetic, dtype=y.dtype)
+            labels[:len(x)] = y.to_numpy()
+
+            rng = np.random.default_rng(self.random_state)
+            position = len(x)
+            for cls, count in zip(classes, counts):
+                n_new = int(target_count - count)
+                if n_new == 0:
+                    continue
+                x_class = x[(y == cls).to_numpy()].to_numpy(dtype=np.float64) #Interpolated in float64 like imblearn's SMOTE
+                if len(x_class) < 2:
+                    logger.warning(f"Class {cls} has a single sample, its {n_new} synthetic rows duplicate it")
+                neighbors = self.minority_neighbors(x_class)
+                for start in range(0, n_new, self.chunk_size):
+                    size = min(self.chunk_size, n_new - start)
+                    base = rng.integers(0, len(x_class), size)
+                    neighbor = neighbors[base, rng.integers(0, neighbors.shape[1], size)]
+                    gap = rng.random((size, 1))
+                    synthetic = x_class[base] + gap * (x_class[neighbor] - x_class[base])
+                    for j, col in enumerate(x.columns):
+                        # Cast to the column's storage dtype the way imblearn restores the input dtypes (integers truncate)
+                        columns[col][position:position + size] = synthetic[:, j].astype(columns[col].dtype)
+                    labels[position:position + size] = cls
+                    position += size
+                logger.info(f"Generated {n_new} synthetic rows for class {cls}")
+            peak = tracemalloc.get_traced_memory()[1] if self.measure_memory else None
+        finally:
+            if trace:
+                tracemalloc.stop()
+
+        self.stats = {"seconds": round(time.perf_counter() - started, 3), "synthetic_rows": n_synthetic}
+        if peak is not None:
+            self.stats["peak_memory_mb"] = round(peak / 1024 / 1024, 2)
+            logger.info(f"SMOTE balancing took {self.stats['seconds']}s with peak memory {self.stats['peak_memory_mb']} MB")
+        else:
+            logger.info(f"SMOTE balancing took {self.stats['seconds']}s")
+        return pd.DataFrame(columns), pd.Series(labels, name=y.name)
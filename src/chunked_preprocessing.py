@@ -0,0 +1,171 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+def _zero_out_fperr(values):
+    return np.where(np.abs(values) < 1e-14, 0.0, values) #Same rounding pandas applies before dividing
+
+def skewness_from_moments(count, m2, m3):
+    # Bias-corrected sample skewness from the count and the central moment sums, the formula of DataFrame.skew
+    count, m2, m3 = np.asarray(count, dtype=np.float64), _zero_out_fperr(m2), _zero_out_fperr(m3)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        skew = (count * (count - 1) ** 0.5 / (count - 2)) * (m3 / m2 ** 1.5)
+    skew = np.where(m2 == 0, 0.0, skew)
+    return np.where(count < 3, np.nan, skew)
+
+class RunningMoments:
+    # Count, mean and 2nd / 3rd central moment sums per column, merged chunk by chunk (Chan et al. pairwise update)
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.count = np.zeros(len(self.columns))
+        self.mean = np.zeros(len(self.columns))
+        self.m2 = np.zeros(len(self.columns))
+        self.m3 = np.zeros(len(self.columns))
+
+    def update(self, df):
+        values = df[self.columns].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        count = present.sum(axis=0).astype(np.float64)
+        if not count.any():
+            return self
+        with np.errstate(invalid="ignore"):
+            mean = np.where(present, values, 0.0).sum(axis=0) / count
+        centered = np.where(present, values - mean, 0.0) #Missing values add nothing to the sums, like skipna
+        squared = centered * centered
+        m2 = squared.sum(axis=0)
+        m3 = (squared * centered).sum(axis=0)
+
+        total = self.count + count
+        with np.errstate(divide="ignore", invalid="ignore"):
+            delta = np.where(count > 0, mean - self.mean, 0.0)
+            new_mean = np.where(total > 0, self.mean + delta * count / total, 0.0)
+            new_m2 = self.m2 + m2 + np.where(total > 0, delta ** 2 * self.count * count / total, 0.0)
+            new_m3 = self.m3 + m3 + np.where(
+                total > 0,
+                delta ** 3 * self.count * count * (self.count - count) / total ** 2 + 3 * delta * (self.count * m2 - count * self.m2) / total,
+                0.0
+            )
+        self.count, self.mean, self.m2, self.m3 = total, new_mean, new_m2, new_m3
+        return self
+
+    def skew(self):
+        return pd.Series(skewness_from_moments(self.count, self.m2, self.m3), index=self.columns)
+
+class DuplicateFilter:
+    # 64-bit hashes of every row kept so far; a row is kept only the first time its values appear (keep="first").
+    # The hashes live in sorted runs of at least doubling size (a small LSM tree): a chunk adds one run and merges it
+    # with the runs no more than twice its size, so each hash is merged O(log rows) times rather than the whole set
+    # being copied for every chunk. Runs over spill_rows are written to a temporary directory, memory-mapped and never
+    # merged again, which bounds the resident hashes. Two distinct rows with the same 64-bit hash (odds about
+    # rows**2 / 2**65, ~3e-4 at 100M rows) would count as duplicates
+    def __init__(self, spill_rows=10000000):
+        self.spill_rows = spill_rows
+        self.runs = [] #In memory, sorted, sizes at least doubling from last to first
+        self.spilled = [] #Memory-mapped runs on disk
+        self.spill_dir = None
+
+    def row_hashes(self, df):
+        # Numbers are hashed as float64 so a column read as int in one chunk and float in another hashes the same
+        canonical = df.astype({col: np.float64 for col in df.columns if pd.api.types.is_numeric_dtype(df[col])})
+        return pd.util.hash_pandas_object(canonical, index=False).to_numpy()
+
+    def seen(self, sorted_hashes):
+        # Sorted queries make searchsorted walk each run in order instead of jumping around it
+        found = np.zeros(len(sorted_hashes), dtype=bool)
+        for run in self.spilled + self.runs:
+            positions = np.minimum(np.searchsorted(run, sorted_hashes), len(run) - 1)
+            found |= run[positions] == sorted_hashes
+        return found
+
+    def add(self, sorted_hashes):
+        run = sorted_hashes
+        while self.runs and len(self.runs[-1]) <= 2 * len(run):
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind="stable") #Timsort merges the two sorted halves in linear time
+        if self.spill_rows and len(run) >= self.spill_rows:
+            self.spilled.append(self.spill(run))
+        else:
+            self.runs.append(run)
+
+    def spill(self, run):
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="dedupe-")
+        path = os.path.join(self.spill_dir, f"run_{len(self.spilled)}.npy")
+        np.save(path, run)
+        return np.load(path, mmap_mode="r")
+
+    def first_occurrences(self, df):
+        hashes = self.row_hashes(df)
+        order = np.argsort(hashes, kind="stable") #Equal hashes stay in row order, so the first of each is the one kept
+        sorted_hashes = hashes[order]
+        new = np.r_[True, sorted_hashes[1:] != sorted_hashes[:-1]] & ~self.seen(sorted_hashes)
+        if new.any():
+            self.add(sorted_hashes[new])
+        keep = np.empty(len(hashes), dtype=bool)
+        keep[order] = new
+        return keep
+
+    def close(self):
+        self.runs, self.spilled = [], []
+        if self.spill_dir is not None:
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+            self.spill_dir = None
+
+class StreamingStatistics:
+    # First pass over the chunks: column dtypes and duplicate rows, plus category vocabularies and skewness moments when fitting
+    def __init__(self, categorical_features, numerical_features, drop_columns=(), fit=True, spill_rows=10000000):
+        self.categorical_features = list(categorical_features)
+        self.numerical_features = list(numerical_features)
+        self.drop_columns = list(drop_columns)
+        self.fit = fit
+        self.vocabularies = {col: set() for col in self.categorical_features}
+        self.moments = RunningMoments(self.numerical_features)
+        self.duplicates = DuplicateFilter(spill_rows)
+        self.keep_masks = [] #One boolean mask per chunk, so the second pass does not hash again
+        self.dtypes = None
+        self.rows = 0
+        self.unique_rows = 0
+
+    def update_dtypes(self, chunk):
+        # Common dtype of each column over all chunks, i.e. what a single read of the whole file infers
+        if self.dtypes is None:
+            self.dtypes = chunk.dtypes.to_dict()
+            return
+        for col, dtype in chunk.dtypes.items():
+            current = self.dtypes[col]
+            if dtype == current:
+                continue
+            if pd.api.types.is_numeric_dtype(dtype) and pd.api.types.is_numeric_dtype(current):
+                self.dtypes[col] = np.result_type(current, dtype) #e.g. int64 + float64 (a chunk with missing values) -> float64
+            elif pd.api.types.is_numeric_dtype(current):
+                self.dtypes[col] = dtype #An all-missing chunk of a text column is read as float
+
+    def update(self, chunk):
+        chunk = chunk.drop(columns=self.drop_columns)
+        self.update_dtypes(chunk)
+        keep = self.duplicates.first_occurrences(chunk)
+        self.keep_masks.append(keep)
+        self.rows += len(chunk)
+        self.unique_rows += int(keep.sum())
+        if self.fit:
+            chunk = chunk[keep]
+            for col in self.categorical_features:
+                self.vocabularies[col].update(chunk[col].dropna().unique().tolist())
+            self.moments.update(chunk)
+        return self
+
+    def finish(self):
+        self.duplicates.close()
+        self.duplicates = None #The hashes are only needed while streaming the first pass
+        logger.info(f"First pass: {self.rows} rows, {self.rows - self.unique_rows} duplicates")
+        return self
+
+    def category_maps(self):
+        return {col: sorted(values) for col, values in self.vocabularies.items()}
+
+    def skewness(self):
+        return self.moments.skew()
@@ -0,0 +1,147 @@
+import json
+import os
+import numpy as np
+from src.logger import get_logger
+
+# Only numpy is needed to score a compiled model, so the serving path does not import lightgbm/sklearn/scipy
+
+logger = get_logger(__name__)
+
+MISSING_TYPES = {"None": 0, "Zero": 1, "NaN": 2}
+ZERO_THRESHOLD = 1e-35 #Same value LightGBM uses to decide that a feature is zero
+ARRAY_NAMES = ["feature", "threshold", "left", "right", "value", "default_left", "missing_type", "roots"]
+
+class CompiledForest:
+    def __init__(self, feature, threshold, left, right, value, default_left, missing_type, roots, feature_names, max_depth, sigmoid=1.0):
+        # One flat node table for all trees; leaves are the nodes that point to themselves
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.default_left = default_left
+        self.missing_type = missing_type
+        self.roots = roots
+        self.feature_name_ = list(feature_names)
+        self.n_features_in_ = len(self.feature_name_)
+        self.max_depth = int(max_depth)
+        self.sigmoid = float(sigmoid)
+        self.classes_ = np.array([0, 1])
+        self.has_missing_branches = bool((missing_type != MISSING_TYPES["None"]).any())
+
+    @classmethod
+    def from_lgbm(cls, model):
+        dump = model.booster_.dump_model()
+        objective = dump.get("objective", "")
+        if not objective.startswith("binary") or dump["num_tree_per_iteration"] != 1 or dump.get("average_output"):
+            raise ValueError(f"Only binary LightGBM models can be compiled, got objective '{objective}'")
+        sigmoid = 1.0
+        for token in objective.split():
+            if token.startswith("sigmoid:"):
+                sigmoid = float(token.split(":")[1])
+
+        nodes = {name: [] for name in ["feature", "threshold", "left", "right", "value", "default_left", "missing_type"]}
+        roots = []
+        max_depth = 0
+
+        def add_node(node, depth):
+            nonlocal max_depth
+            node_id = len(nodes["feature"])
+            for name in nodes:
+                nodes[name].append(0)
+            if "leaf_value" in node or "split_index" not in node:
+                max_depth = max(max_depth, depth)
+                nodes["value"][node_id] = node.get("leaf_value", 0.0)
+                nodes["threshold"][node_id] = np.inf
+                nodes["left"][node_id] = node_id
+                nodes["right"][node_id] = node_id
+                return node_id
+            if node["decision_type"] != "<=":
+                raise ValueError(f"Unsupported split type '{node['decision_type']}' (categorical splits are not compiled)")
+            nodes["feature"][node_id] = node["split_feature"]
+            nodes["threshold"][node_id] = node["threshold"]
+            nodes["default_left"][node_id] = node["default_left"]
+            nodes["missing_type"][node_id] = MISSING_TYPES[node["missing_type"]]
+            nodes["left"][node_id] = add_node(node["left_child"], depth + 1)
+            nodes["right"][node_id] = add_node(node["right_child"], depth + 1)
+            return node_id
+
+        for tree in dump["tree_info"]:
+            roots.append(add_node(tree["tree_structure"], 0))
+
+        return cls(
+            feature=np.array(nodes["feature"], dtype=np.int32),
+            threshold=np.array(nodes["threshold"], dtype=np.float64),
+            left=np.array(nodes["left"], dtype=np.int32),
+            right=np.array(nodes["right"], dtype=np.int32),
+            value=np.array(nodes["value"], dtype=np.float64),
+            default_left=np.array(nodes["default_left"], dtype=bool),
+            missing_type=np.array(nodes["missing_type"], dtype=np.int8),
+            roots=np.array(roots, dtype=np.int32),
+            feature_names=dump["feature_names"],
+            max_depth=max_depth,
+            sigmoid=sigmoid
+        )
+
+    def save(self, model_dir):
+        os.makedirs(model_dir, exist_ok=True)
+        for name in ARRAY_NAMES:
+            np.save(os.path.join(model_dir, f"{name}.npy"), getattr(self, name))
+        with open(os.path.join(model_dir, "meta.json"), "w") as f:
+            json.dump({"feature_names": self.feature_name_, "max_depth": self.max_depth, "sigmoid": self.sigmoid}, f)
+        logger.info(f"Compiled model with {len(self.roots)} trees and {len(self.feature)} nodes saved to {model_dir}")
+
+    @classmethod
+    def load(cls, model_dir, mmap=True):
+        # Memory-mapped arrays are shared through the page cache instead of being copied into every process
+        mmap_mode = "r" if mmap else None
+        arrays = {name: np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAY_NAMES}
+        with open(os.path.join(model_dir, "meta.json")) as f:
+            meta = json.load(f)
+        logger.info(f"Compiled model loaded from {model_dir}")
+        return cls(feature_names=meta["feature_names"], max_depth=meta["max_depth"], sigmoid=meta["sigmoid"], **arrays)
+
+    def predict_raw(self, x, chunk_size=10000):
+        x = np.asarray(x, dtype=np.float64)
+        if x.ndim != 2 or x.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected a 2D array with {self.n_features_in_} features, got shape {x.shape}")
+        if not self.has_missing_branches:
+            x = np.nan_to_num(x, nan=0.0) #Every split uses missing_type None, where LightGBM scores NaN as 0
+        raw = np.empty(len(x), dtype=np.float64)
+        for start in range(0, len(x), chunk_size):
+            raw[start:start + chunk_size] = self._traverse(x[start:start + chunk_size])
+        return raw
+
+    def _traverse(self, x):
+        # Advance every unfinished (row, tree) pair one level per step instead of walking each tree per row;
+        # pairs drop out of the active set as soon as they reach a leaf
+        n_rows, n_trees = len(x), len(self.roots)
+        x_flat = x.ravel()
+        node = np.tile(self.roots, n_rows)
+        row_offset = np.repeat(np.arange(n_rows, dtype=np.int64) * x.shape[1], n_trees)
+        active = np.flatnonzero(self.left[node] != node)
+        for _ in range(self.max_depth):
+            if not len(active):
+                break
+            current = node[active]
+            values = x_flat[row_offset[active] + self.feature[current]]
+            if not self.has_missing_branches:
+                go_left = values <= self.threshold[current]
+            else:
+                missing_type = self.missing_type[current]
+                is_nan = np.isnan(values)
+                values = np.where(is_nan & (missing_type != MISSING_TYPES["NaN"]), 0.0, values)
+                go_left = values <= self.threshold[current]
+                is_missing = ((missing_type == MISSING_TYPES["Zero"]) & (np.abs(values) <= ZERO_THRESHOLD)) | ((missing_type == MISSING_TYPES["NaN"]) & is_nan)
+                go_left = np.where(is_missing, self.default_left[current], go_left)
+            following = np.where(go_left, self.left[current], self.right[current])
+            node[active] = following
+            active = active[self.left[following] != following]
+        return self.value[node].reshape(n_rows, n_trees).sum(axis=1)
+
+    def predict_proba(self, x):
+        positive = 1.0 / (1.0 + np.exp(-self.sigmoid * self.predict_raw(x)))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, x):
+        return (self.predict_proba(x)[:, 1] > 0.5).astype(int)
@@ -1,13 +1,15 @@
 import os
+import numpy as np
 import pandas as pd
-from google.cloud import storage
 # from sklearn import train_test_split
 from sklearn.model_selection import train_test_split
 from sklearn import preprocessing
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
-from utils.common_function import read_yaml
+from utils.common_function import read_yaml, load_data, save_data, iter_data, ArtifactWriter
+from src.gcs_downloader import ParallelDownloader, get_storage_client
+from utils.profiler import profile_stage, profiler
 
 logger = get_logger(__name__)
 
@@ -17,37 +19,96 @@ class DataIngestion:
         self.bucket_name = self.config["bucket_name"]
         self.file_name=self.config["bucket_file_name"]
         self.train_test_ratio = self.config["train_size"]
+        self.streaming = self.config.get("streaming", False)
+        self.chunk_size = self.config.get("chunk_size", 100000)
+        self.stream_from_gcs = self.config.get("stream_from_gcs", False)
+        self.download_chunk_size_mb = self.config.get("download_chunk_size_mb", 32)
+        self.download_workers = self.config.get("download_workers", 8)
+        self.download_retries = self.config.get("download_retries", 3)
         
         
         os.makedirs(RAW_DIR,exist_ok=True) #This will create the directory if it does not exist
         logger.info(f"Data injestion started with {self.bucket_name} and the file is {self.file_name}")
         
+    @profile_stage()
     def download_csv_from_gcp(self):
         try:
-            client= storage.Client() #This will create a client to access the GCP bucket
-            bucket= client.bucket(self.bucket_name) #This will create a bucket object to access the GCP bucket
-            blob= bucket.blob(self.file_name) #This will create a blob object to access the file in the GCP bucket (I.e FILE NAME)
-            blob.download_to_filename(RAW_FILE_PATH) #This will download the file from the GCP bucket to the local machine
-            logger.info(f"CSV file is successfully downloaded from GCP bucket {self.bucket_name} and the file is {self.file_name}")
+            client= get_storage_client() #This will create a client to access the GCP bucket (or its local stand-in)
+            downloader = ParallelDownloader(
+                client, self.bucket_name, self.file_name, RAW_FILE_PATH,
+                chunk_size_mb=self.download_chunk_size_mb, max_workers=self.download_workers, max_retries=self.download_retries
+            )
+            downloaded = downloader.download() #Ranged, multi-threaded and resumable; skipped when RAW_FILE_PATH is already current
+            if downloaded:
+                logger.info(f"CSV file is successfully downloaded from GCP bucket {self.bucket_name} and the file is {self.file_name}")
         except Exception as e:
             logger.error(f"Error while downloading the file from GCP bucket: {e}")
             raise CustomException(f"Filed to download the CSV",e) 
+    @profile_stage()
     def split_data(self):
         try:
             logger.info("starting the data splitting process")
-            df = pd.read_csv(RAW_FILE_PATH) 
+            df = load_data(RAW_FILE_PATH)
+            profiler.set_rows(len(df))
             train_data,test_data = train_test_split(df,train_size= self.train_test_ratio,random_state=42)
-            train_data.to_csv(TRAIN_FILE_PATH,index=False) #This will save the train data to the local machine
-            test_data.to_csv(TEST_FILE_PATH,index=False) #This will save the test data to the local machine
+            save_data(train_data, TRAIN_FILE_PATH) #This will save the train data to the local machine in ARTIFACT_FORMAT
+            save_data(test_data, TEST_FILE_PATH) #This will save the test data to the local machine in ARTIFACT_FORMAT
             logger.info("Data splitting is completed and the files are saved to the local machine")
         except Exception as e:
             logger.error("Error while splitting the data : {e}")
             raise CustomException("Filed to split the data",e)
+    def is_train_row(self, booking_ids):
+        # Deterministic split: a booking always lands on the same side, whichever chunk or run it appears in
+        hashes = pd.util.hash_pandas_object(booking_ids.astype(str), index=False).to_numpy()
+        return (hashes % np.uint64(1000000)) < np.uint64(round(self.train_test_ratio * 1000000))
+    def iter_raw_chunks(self):
+        if self.stream_from_gcs:
+            client = get_storage_client()
+            blob = client.bucket(self.bucket_name).blob(self.file_name)
+            logger.info(f"Streaming gs://{self.bucket_name}/{self.file_name} in chunks of {self.chunk_size} rows")
+            with blob.open("rb") as f: #Reads the object in ranged requests instead of downloading it first
+                yield from pd.read_csv(f, chunksize=self.chunk_size)
+        else:
+            yield from iter_data(RAW_FILE_PATH, chunk_size=self.chunk_size)
+    @profile_stage()
+    def split_data_streaming(self):
+        try:
+            logger.info("starting the streaming data splitting process")
+            with ArtifactWriter(TRAIN_FILE_PATH) as train_writer, ArtifactWriter(TEST_FILE_PATH) as test_writer:
+                for chunk in self.iter_raw_chunks():
+                    is_train = self.is_train_row(chunk["Booking_ID"])
+                    train_writer.write(chunk[is_train])
+                    test_writer.write(chunk[~is_train])
+            profiler.set_rows(train_writer.rows_written + test_writer.rows_written)
+            logger.info(f"Streaming split completed: {train_writer.rows_written} train rows, {test_writer.rows_written} test rows")
+        except Exception as e:
+            logger.error(f"Error while splitting the data in streaming mode : {e}")
+            raise CustomException("Failed to split the data in streaming mode",e)
+    def outputs(self):
+        # Files run() writes; streaming straight from the bucket never creates RAW_FILE_PATH
+        if self.streaming and self.stream_from_gcs:
+            return [TRAIN_FILE_PATH, TEST_FILE_PATH]
+        return [RAW_FILE_PATH, TRAIN_FILE_PATH, TEST_FILE_PATH]
+    def get_source_version(self):
+        # Generation + md5 of the bucket object, lets the stage cache notice a new upload without downloading it
+        try:
+            blob = get_storage_client().bucket(self.bucket_name).get_blob(self.file_name)
+            if blob is None:
+                return None
+            return {"generation": blob.generation, "md5_hash": blob.md5_hash}
+        except Exception as e:
+            logger.error(f"Error while reading the GCP object metadata: {e}")
+            raise CustomException("Failed to read the GCP object metadata", e)
     def run(self):
         try:
             logger.info("Data ingestion started")
-            self.download_csv_from_gcp() #This will download the file from the GCP bucket to the local machine
-            self.split_data() #This will split the data into train and test data and save it to the local machine
+            if self.streaming:
+                if not self.stream_from_gcs:
+                    self.download_csv_from_gcp() #This will download the file from the GCP bucket to the local machine
+                self.split_data_streaming() #Chunked, hash based split with bounded memory
+            else:
+                self.download_csv_from_gcp() #This will download the file from the GCP bucket to the local machine
+                self.split_data() #This will split the data into train and test data and save it to the local machine
             logger.info("Data ingestion is completed")
         except Exception as e:
             logger.error(f"Error while running the data ingestion: {e}")
@@ -4,81 +4,112 @@ import numpy as np
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
-from utils.common_function import load_data , read_yaml
-from sklearn.preprocessing import StandardScaler , LabelEncoder
+from utils.common_function import load_data , read_yaml, save_data, iter_data, ArtifactWriter
+from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
-from sklearn.ensemble import RandomForestClassifier
-from imblearn.over_sampling import SMOTE
+from src.feature_transformer import FeatureTransformer
+from src.feature_selection import FeatureSelector
+from src.balancing import ChunkedSMOTE
+from src.chunked_preprocessing import StreamingStatistics
+from utils.profiler import profile_stage, profiler
 
 logger = get_logger(__name__)
 
 class DataProcessor:
-    def __init__ (self,train_path, test_path,processed_dir,config_path):
+    def __init__ (self,train_path, test_path,processed_dir,config_path,preprocessor_path=PROCESSED_PREPROCESSOR_PATH):
         self.train_path = train_path
         self.test_path = test_path
         self.processed_dir = processed_dir
         self.config_path = config_path
         self.config = read_yaml(config_path)
+        self.preprocessor_path = preprocessor_path
+        self.transformer = FeatureTransformer.from_config(self.config["data_processing"])
+        self.balancing_config = self.config["data_processing"]["balancing"]
+        self.feature_selector = FeatureSelector(cache_path=FEATURE_RANKING_CACHE_PATH, **self.config["data_processing"]["feature_selection"])
+        self.chunked_config = self.config["data_processing"].get("chunked", {"enabled": False})
+        self.read_dtypes = self.config["data_processing"].get("read_dtypes")
         
         if not os.path.exists(self.processed_dir):
             os.makedirs(self.processed_dir)
             logger.info(f"Directory {self.processed_dir} created.")
-    def preprocess_data(self,df):
+    @profile_stage(rows=len)
+    def preprocess_data(self,df,fit=False):
         try:
             logger.info("Starting data preprocessing...")
             logger.info("Dropping columns...")
             df.drop(columns=['Booking_ID'],inplace=True)
             df.drop_duplicates(inplace=True)
             
-            cat_cols = self.config["data_processing"]["categorical_features"]
-            num_cols = self.config["data_processing"]["numerical_features"]
-            logger.info("Starting label encoding...")
-            le = LabelEncoder()
-            for col in cat_cols:
-                df[col] = le.fit_transform(df[col])
-            logger.info("Label encoding completed.")
-            
-            logger.info("Skewness handling started...")
-            skewness_threshold = self.config["data_processing"]["skewness_threshold"]
-            skewness = df[num_cols].apply(lambda x: x.skew())
-            for column in skewness[skewness> skewness_threshold].index:
-                if skewness[column] > 0:
-                    df[column] = np.log1p(df[column])
-                else:
-                    df[column] = np.expm1(df[column])
-            logger.info("Skewness handling completed.")
+            if fit:
+                logger.info("Fitting category maps and skewness transforms...")
+                self.transformer.fit(df) #Fitted on train only, test reuses the same encodings
+            logger.info("Applying label encoding and skewness handling...")
+            df = self.transformer.transform(df)
+            logger.info("Label encoding and skewness handling completed.")
             return df
         except Exception as e:
             logger.error("Error in data preprocessing: %s", str(e))
             raise CustomException("Error while data pre-processing", e)   
+    @profile_stage()
+    def preprocess_chunked(self,input_path,output_path,fit=False):
+        # Two passes over the file in chunks, never holding the raw frame: the first streams dtypes, duplicate hashes and
+        # (when fitting) vocabularies / skewness moments, the second transforms each chunk and appends it to output_path.
+        # The result is the frame preprocess_data returns for the whole file.
+        try:
+            chunk_size = self.chunked_config["chunk_size"]
+            logger.info(f"Starting chunked preprocessing of {input_path}...")
+            stats = StreamingStatistics(self.transformer.categorical_features, self.transformer.numerical_features,
+                                        drop_columns=['Booking_ID'], fit=fit,
+                                        spill_rows=self.chunked_config.get("dedupe_spill_rows", 10000000))
+            for chunk in iter_data(input_path, chunk_size=chunk_size, dtype=self.read_dtypes):
+                stats.update(chunk)
+            stats.finish()
+            if fit:
+                logger.info("Fitting category maps and skewness transforms from the streamed statistics...")
+                self.transformer.fit_statistics(stats.category_maps(), stats.skewness())
+
+            logger.info("Applying label encoding and skewness handling chunk by chunk...")
+            with ArtifactWriter(output_path) as writer:
+                for chunk, keep in zip(iter_data(input_path, chunk_size=chunk_size, dtype=self.read_dtypes), stats.keep_masks):
+                    chunk = chunk.drop(columns=['Booking_ID']).astype(stats.dtypes)
+                    writer.write(self.transformer.transform(chunk[keep]))
+            profiler.set_rows(writer.rows_written)
+            logger.info("Chunked preprocessing completed.")
+            return load_data(output_path) #Encoded, numeric only: far smaller than the raw frame with its text columns
+        except Exception as e:
+            logger.error("Error in chunked preprocessing: %s", str(e))
+            raise CustomException("Error while chunked data pre-processing", e)
+    @profile_stage(rows=len)
     def balance_data(self,df):
          try:
              logger.info("Starting data balancing...")
              x = df.drop(columns=['booking_status'])
              y = df['booking_status']
-             smote = SMOTE(random_state=42)
-             x_resampled, y_resampled = smote.fit_resample(x,y)
-             balanced_df = pd.DataFrame(x_resampled, columns=x.columns)
+             smote = ChunkedSMOTE(
+                 k_neighbors=self.balancing_config["k_neighbors"],
+                 chunk_size=self.balancing_config["chunk_size"],
+                 n_jobs=self.balancing_config["n_jobs"],
+                 random_state=42,
+                 measure_memory=self.balancing_config.get("measure_memory", False)
+             )
+             balanced_df, y_resampled = smote.fit_resample(x,y) #Compact dtypes, synthetic rows generated in bounded chunks
              balanced_df['booking_status'] = y_resampled
-             balanced_df.to_csv('balanced_train.csv', index=False)
+             if self.balancing_config["save_balanced"]:
+                 save_data(balanced_df, BALANCED_TRAIN_PATH)
              logger.info("Data balancing completed.")
              return balanced_df
          except Exception as e:
                 logger.error("Error in data balancing: %s", str(e))
                 raise CustomException("Error while data balancing", e)
+    @profile_stage(rows=len)
     def select_features(self,df):
         try:
             logger.info("Starting feature selection...")
             x= df.drop(columns=['booking_status'])
             y = df['booking_status']
-            model =RandomForestClassifier()
-            model.fit(x, y)
-            feature_importance = model.feature_importances_
-            feature_importance_df = pd.DataFrame({'Feature': x.columns, 'Importance': feature_importance})
-            top_feature_imp_df = feature_importance_df.sort_values(by='Importance', ascending=False)
             num_features_to_select = self.config["data_processing"]["no_of_features"]
-            top_ten_features = top_feature_imp_df['Feature'].head(num_features_to_select).values
-            top_ten_df = df[top_ten_features.tolist() + ['booking_status']]
+            top_ten_features = self.feature_selector.select(x, y, num_features_to_select)
+            top_ten_df = df[top_ten_features + ['booking_status']]
             logger.info("Feature selection completed.")
             return top_ten_df
         except Exception as e:
@@ -87,27 +118,33 @@ class DataProcessor:
     def save_data(self,df,file_path):
         try:
             logger.info("Saving data...")
-            df.to_csv(file_path, index=False)
+            save_data(df, file_path)
             logger.info(f"Data saved to {file_path}.")
         except Exception as e:
             logger.error("Error in saving data: %s", str(e))
             raise CustomException("Error while saving data", e)
     def process(self):
         try:
-            logger.info("Loading data from RAW files...")
-            train_df = load_data(self.train_path)
-            test_df = load_data(self.test_path)
-            logger.info("Data loaded successfully.")
-            train_df = self.preprocess_data(train_df)
-            test_df = self.preprocess_data(test_df)
-            train_df = self.balance_data(train_df)
-            test_df = self.balance_data(test_df)
+            if self.chunked_config["enabled"]:
+                train_df = self.preprocess_chunked(self.train_path, PREPROCESSED_TRAIN_PATH, fit=True)
+                test_df = self.preprocess_chunked(self.test_path, PREPROCESSED_TEST_PATH)
+            else:
+                logger.info("Loading data from RAW files...")
+                train_df = load_data(self.train_path, dtype=self.read_dtypes)
+                test_df = load_data(self.test_path, dtype=self.read_dtypes)
+                logger.info("Data loaded successfully.")
+                train_df = self.preprocess_data(train_df, fit=True)
+                test_df = self.preprocess_data(test_df)
+            real_train_df = train_df
+            train_df = self.balance_data(train_df) #Only the training split is oversampled, test keeps the real class mix
             train_df = self.select_features(train_df)
-            test_df = train_df[train_df.columns]
-            os.makedirs(PROCESSED_TRAIN_PATH, exist_ok=True)
-            os.makedirs(PROCESSED_TEST_PATH, exist_ok=True)
-            self.save_data(train_df, os.path.join(PROCESSED_TRAIN_PATH, 'train_processed.csv'))
-            self.save_data(test_df, os.path.join(PROCESSED_TEST_PATH, 'test_processed.csv'))
+            test_df = test_df[train_df.columns]
+            real_train_df = real_train_df[train_df.columns]
+            self.transformer.set_selected_features(train_df.columns)
+            self.transformer.save(self.preprocessor_path) #Staged with the processed data; the registry publishes it with the model trained on it
+            self.save_data(train_df, PROCESSED_TRAIN_PATH)
+            self.save_data(test_df, PROCESSED_TEST_PATH)
+            self.save_data(real_train_df, PROCESSED_REAL_TRAIN_PATH)
             logger.info("Data processing completed.")
         except Exception as e:
             logger.error("Error in data processing: %s", str(e))
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import time
+import pandas as pd
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# name -> function(x, y, n_jobs, random_state) returning one importance per column of x
+IMPORTANCE_BACKENDS = {}
+
+def register_backend(name):
+    def decorator(fn):
+        IMPORTANCE_BACKENDS[name] = fn
+        return fn
+    return decorator
+
+@register_backend("random_forest")
+def random_forest_importance(x, y, n_jobs=-1, random_state=42):
+    from sklearn.ensemble import RandomForestClassifier
+    model = RandomForestClassifier(n_jobs=n_jobs, random_state=random_state)
+    model.fit(x, y)
+    return model.feature_importances_
+
+@register_backend("lgbm_gain")
+def lgbm_gain_importance(x, y, n_jobs=-1, random_state=42):
+    import lightgbm as lgb
+    model = lgb.LGBMClassifier(n_estimators=100, importance_type="gain", n_jobs=n_jobs, random_state=random_state, verbose=-1)
+    model.fit(x, y)
+    return model.feature_importances_
+
+@register_backend("mutual_info")
+def mutual_info_importance(x, y, n_jobs=-1, random_state=42):
+    from sklearn.feature_selection import mutual_info_classif
+    discrete = [pd.api.types.is_integer_dtype(dtype) for dtype in x.dtypes] #Integer columns (codes, counts) use the discrete estimator
+    return mutual_info_classif(x, y, discrete_features=discrete, n_jobs=n_jobs, random_state=random_state)
+
+class FeatureSelector:
+    def __init__(self, backend="lgbm_gain", sample_size=50000, n_jobs=-1, use_cache=True, cache_path=None, random_state=42):
+        if backend not in IMPORTANCE_BACKENDS:
+            raise ValueError(f"Unknown feature importance backend '{backend}', expected one of {list(IMPORTANCE_BACKENDS)}")
+        self.backend = backend
+        self.sample_size = sample_size
+        self.n_jobs = n_jobs
+        self.use_cache = use_cache and cache_path is not None
+        self.cache_path = cache_path
+        self.random_state = random_state
+        self.last_duration = None
+
+    def fingerprint(self, x, y):
+        sha = hashlib.sha256()
+        sha.update(json.dumps([list(x.columns), self.backend, self.sample_size, self.random_state]).encode())
+        sha.update(pd.util.hash_pandas_object(x, index=False).to_numpy().tobytes())
+        sha.update(pd.util.hash_pandas_object(y, index=False).to_numpy().tobytes())
+        return sha.hexdigest()
+
+    def _read_cache(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        with open(self.cache_path) as f:
+            return json.load(f)
+
+    def _write_cache(self, fingerprint, ranking):
+        cache = self._read_cache()
+        cache[fingerprint] = ranking
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        with open(self.cache_path, "w") as f:
+            json.dump(cache, f, indent=2)
+
+    def sample(self, x, y):
+        if not self.sample_size or len(x) <= self.sample_size:
+            return x, y
+        # Stratified subsample keeps the class balance of the full frame
+        fraction = self.sample_size / len(x)
+        index = y.groupby(y, group_keys=False).sample(frac=fraction, random_state=self.random_state).index
+        return x.loc[index], y.loc[index]
+
+    def rank(self, x, y):
+        fingerprint = self.fingerprint(x, y) if self.use_cache else None
+        if self.use_cache:
+            cached = self._read_cache().get(fingerprint)
+            if cached is not None:
+                logger.info(f"Reusing cached {self.backend} feature ranking for unchanged data")
+                self.last_duration = 0.0
+                return pd.Series(cached)
+        x_sample, y_sample = self.sample(x, y)
+        started = time.perf_counter()
+        importance = IMPORTANCE_BACKENDS[self.backend](x_sample, y_sample, n_jobs=self.n_jobs, random_state=self.random_state)
+        self.last_duration = time.perf_counter() - started
+        logger.info(f"Feature importance with {self.backend} on {len(x_sample)} rows took {self.last_duration:.2f}s")
+        ranking = pd.Series(importance, index=x.columns, dtype=float).sort_values(ascending=False, kind="stable")
+        if self.use_cache:
+            self._write_cache(fingerprint, ranking.to_dict())
+        return ranking
+
+    def select(self, x, y, k):
+        return self.rank(x, y).head(k).index.tolist()
+
+def compare_backends(x, y, k, backends=None, sample_size=50000, n_jobs=-1):
+    # Runs each backend uncached and reports its cost and chosen features, to pick one by measured cost
+    rows = []
+    for backend in backends or list(IMPORTANCE_BACKENDS):
+        selector = FeatureSelector(backend=backend, sample_size=sample_size, n_jobs=n_jobs, use_cache=False)
+        selected = selector.select(x, y, k)
+        rows.append({"backend": backend, "seconds": round(selector.last_duration, 3), "features": selected})
+    return pd.DataFrame(rows)
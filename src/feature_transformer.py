@@ -0,0 +1,100 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+class FeatureTransformer:
+    def __init__(self, categorical_features, numerical_features, skewness_threshold, target="booking_status"):
+        self.categorical_features = list(categorical_features)
+        self.numerical_features = list(numerical_features)
+        self.skewness_threshold = skewness_threshold
+        self.target = target
+        self.category_maps = {} #column -> sorted categories, the code of a category is its position (same as LabelEncoder)
+        self.skew_transforms = {} #column -> "log1p" / "expm1"
+        self.selected_features = None
+
+    @classmethod
+    def from_config(cls, processing_config):
+        return cls(
+            categorical_features=processing_config["categorical_features"],
+            numerical_features=processing_config["numerical_features"],
+            skewness_threshold=processing_config["skewness_threshold"]
+        )
+
+    def fit(self, df):
+        # Every category gets its own vocabulary, learnt once on the training data
+        category_maps = {col: sorted(df[col].dropna().unique().tolist()) for col in self.categorical_features}
+        return self.fit_statistics(category_maps, df[self.numerical_features].skew())
+
+    def fit_statistics(self, category_maps, skewness):
+        # Shared by fit and the chunked preprocessing, which streams the same vocabularies / skewness instead of a frame
+        self.category_maps = category_maps
+        self.skew_transforms = {
+            column: "log1p" if skewness[column] > 0 else "expm1"
+            for column in skewness[skewness > self.skewness_threshold].index
+        }
+        logger.info(f"Feature transformer fitted, skew transforms: {self.skew_transforms}")
+        return self
+
+    def set_selected_features(self, features):
+        self.selected_features = [f for f in features if f != self.target]
+
+    def encode(self, series, categories):
+        if is_numeric_dtype(series):
+            return series #Already label encoded (e.g. the integer codes sent by older clients)
+        return pd.Series(pd.Categorical(series, categories=categories).codes, index=series.index)
+
+    def transform(self, df):
+        df = df.copy()
+        for col, categories in self.category_maps.items():
+            if col in df.columns:
+                df[col] = self.encode(df[col], categories)
+        for col, transform in self.skew_transforms.items():
+            if col in df.columns:
+                df[col] = np.log1p(df[col]) if transform == "log1p" else np.expm1(df[col])
+        return df
+
+    def transform_features(self, df):
+        # Serving path: raw records in, model-ready matrix columns out, rejecting values the model never saw
+        missing = [col for col in self.selected_features if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+        df = df[self.selected_features]
+        for col in self.selected_features:
+            if col in self.category_maps and not is_numeric_dtype(df[col]):
+                unknown = df[col][~df[col].isin(self.category_maps[col])]
+                if len(unknown):
+                    raise ValueError(f"Unknown or missing categories for {col}: {unknown.astype(str).unique()[:20].tolist()}. Expected one of {self.category_maps[col]}")
+        return self.transform(df)
+
+    def to_dict(self):
+        return {
+            "categorical_features": self.categorical_features,
+            "numerical_features": self.numerical_features,
+            "skewness_threshold": self.skewness_threshold,
+            "target": self.target,
+            "category_maps": self.category_maps,
+            "skew_transforms": self.skew_transforms,
+            "selected_features": self.selected_features
+        }
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Feature transformer saved to {file_path}")
+
+    @classmethod
+    def load(cls, file_path):
+        with open(file_path) as f:
+            state = json.load(f)
+        transformer = cls(state["categorical_features"], state["numerical_features"], state["skewness_threshold"], state["target"])
+        transformer.category_maps = state["category_maps"]
+        transformer.skew_transforms = state["skew_transforms"]
+        transformer.selected_features = state["selected_features"]
+        logger.info(f"Feature transformer loaded from {file_path}")
+        return transformer
@@ -0,0 +1,196 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+def md5_base64(file_path):
+    # GCS reports md5_hash as the base64 encoded digest
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            md5.update(block)
+    return base64.b64encode(md5.digest()).decode()
+
+########## LOCAL STAND-IN FOR GCS ############
+# Mirrors the small part of google.cloud.storage used by the pipeline, backed by <root>/<bucket>/<blob>
+
+class LocalBlob:
+    def __init__(self, bucket_dir, name):
+        self.name = name
+        self.path = os.path.join(bucket_dir, name)
+        self.size = None
+        self.md5_hash = None
+        self.generation = None
+
+    def exists(self):
+        return os.path.isfile(self.path)
+
+    def reload(self):
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.generation = stat.st_mtime_ns #A rewritten file gets a new generation, like a new GCS object version
+        self.md5_hash = md5_base64(self.path)
+
+    def download_as_bytes(self, start=None, end=None, if_generation_match=None):
+        if if_generation_match is not None and os.stat(self.path).st_mtime_ns != if_generation_match:
+            raise RuntimeError(f"Generation mismatch for {self.name}")
+        start = start or 0
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(-1 if end is None else end - start + 1) #end is inclusive, as in GCS ranged reads
+
+    def download_to_filename(self, file_path):
+        with open(file_path, "wb") as f:
+            f.write(self.download_as_bytes())
+
+    def open(self, mode="rb"):
+        return open(self.path, mode)
+
+class LocalBucket:
+    def __init__(self, root, name):
+        self.name = name
+        self.bucket_dir = os.path.join(root, name)
+
+    def blob(self, name):
+        return LocalBlob(self.bucket_dir, name)
+
+    def get_blob(self, name):
+        blob = self.blob(name)
+        if not blob.exists():
+            return None
+        blob.reload()
+        return blob
+
+class LocalStorageClient:
+    def __init__(self, root):
+        self.root = root
+
+    def bucket(self, name):
+        return LocalBucket(self.root, name)
+
+def get_storage_client():
+    # GCS_LOCAL_ROOT points the pipeline at a local directory instead of Cloud Storage (offline runs and tests)
+    local_root = os.environ.get("GCS_LOCAL_ROOT")
+    if local_root:
+        logger.info(f"Using local storage client rooted at {local_root}")
+        return LocalStorageClient(local_root)
+    from google.cloud import storage
+    return storage.Client()
+
+########## PARALLEL DOWNLOAD ############
+
+class ParallelDownloader:
+    def __init__(self, client, bucket_name, blob_name, destination, chunk_size_mb=32, max_workers=8, max_retries=3):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.blob_name = blob_name
+        self.destination = destination
+        self.chunk_size = int(chunk_size_mb * 1024 * 1024)
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.part_path = f"{destination}.part"
+        self.state_path = f"{destination}.part.json" #Chunks already on disk, used to resume an interrupted download
+        self.meta_path = f"{destination}.meta.json" #Generation / md5 of the completed local copy
+        self._state_lock = threading.Lock()
+
+    def get_blob(self):
+        blob = self.client.bucket(self.bucket_name).get_blob(self.blob_name)
+        if blob is None:
+            raise FileNotFoundError(f"gs://{self.bucket_name}/{self.blob_name} does not exist")
+        return blob
+
+    @staticmethod
+    def _read_json(path):
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path, data):
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def is_current(self, blob):
+        if not os.path.exists(self.destination) or os.path.getsize(self.destination) != blob.size:
+            return False
+        meta = self._read_json(self.meta_path)
+        if meta and meta.get("generation") == blob.generation and meta.get("md5_hash") == blob.md5_hash:
+            return True
+        # No sidecar (e.g. file copied in by hand): fall back to hashing the local copy once
+        if blob.md5_hash and md5_base64(self.destination) == blob.md5_hash:
+            self._write_json(self.meta_path, {"generation": blob.generation, "md5_hash": blob.md5_hash})
+            return True
+        return False
+
+    def _load_state(self, blob):
+        state = self._read_json(self.state_path)
+        if state and state["generation"] == blob.generation and state["size"] == blob.size and os.path.exists(self.part_path):
+            return state
+        # New object version or no previous attempt: start from an empty, preallocated part file
+        with open(self.part_path, "wb") as f:
+            f.truncate(blob.size)
+        state = {"generation": blob.generation, "size": blob.size, "chunk_size": self.chunk_size, "completed": []}
+        self._write_json(self.state_path, state)
+        return state
+
+    def _fetch_chunk(self, blob, fd, state, start, end):
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                data = blob.download_as_bytes(start=start, end=end, if_generation_match=blob.generation)
+                if len(data) != end - start + 1:
+                    raise IOError(f"Short read for bytes {start}-{end}: got {len(data)}")
+                os.pwrite(fd, data, start)
+                # Recorded as soon as it is on disk, so chunks finished before a failure are not fetched again
+                with self._state_lock:
+                    state["completed"].append(start)
+                    self._write_json(self.state_path, state)
+                return start
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                wait = 2 ** (attempt - 1)
+                logger.warning(f"Chunk {start}-{end} failed (attempt {attempt}/{self.max_retries}): {e}, retrying in {wait}s")
+                time.sleep(wait)
+
+    def download(self):
+        try:
+            blob = self.get_blob()
+            if self.is_current(blob):
+                logger.info(f"{self.destination} already matches generation {blob.generation}, skipping download")
+                return False
+            os.makedirs(os.path.dirname(self.destination) or ".", exist_ok=True)
+            state = self._load_state(blob)
+            chunk_size = state["chunk_size"]
+            done = set(state["completed"])
+            pending = [start for start in range(0, blob.size, chunk_size) if start not in done]
+            logger.info(f"Downloading gs://{self.bucket_name}/{self.blob_name} ({blob.size} bytes): {len(pending)} chunks pending, {len(done)} already on disk")
+            started = time.perf_counter()
+            fd = os.open(self.part_path, os.O_WRONLY)
+            try:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = [executor.submit(self._fetch_chunk, blob, fd, state, start, min(start + chunk_size, blob.size) - 1) for start in pending]
+                    for future in as_completed(futures):
+                        future.result()
+            finally:
+                os.close(fd)
+            if blob.md5_hash and md5_base64(self.part_path) != blob.md5_hash:
+                os.remove(self.state_path) #Corrupt copy, do not resume from it
+                raise IOError(f"MD5 mismatch after downloading {self.blob_name}")
+            os.replace(self.part_path, self.destination)
+            os.remove(self.state_path)
+            self._write_json(self.meta_path, {"generation": blob.generation, "md5_hash": blob.md5_hash})
+            elapsed = time.perf_counter() - started
+            logger.info(f"Downloaded {blob.size} bytes in {elapsed:.2f}s with {self.max_workers} workers")
+            return True
+        except Exception as e:
+            logger.error(f"Error while downloading gs://{self.bucket_name}/{self.blob_name}: {e}")
+            raise CustomException(f"Failed to download {self.blob_name}", e)
@@ -0,0 +1,92 @@
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import lightgbm as lgb
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterSampler, StratifiedKFold, train_test_split
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Per-process copies of the training data, set once by the pool initializer instead of pickled with every task
+_WORKER_DATA = {}
+
+def _init_worker(x, y, folds, threads):
+    # Threads are capped through n_jobs on each model; OMP_NUM_THREADS is read when LightGBM loads, too late here
+    _WORKER_DATA.update(x=x, y=y, folds=folds, threads=threads)
+
+def _evaluate_candidate(params, n_rounds, early_stopping_rounds, scoring, random_state):
+    x, y, folds, threads = _WORKER_DATA["x"], _WORKER_DATA["y"], _WORKER_DATA["folds"], _WORKER_DATA["threads"]
+    scorer = get_scorer(scoring)
+    scores, best_rounds = [], []
+    for train_idx, fit_idx, stop_idx, val_idx in folds:
+        model = lgb.LGBMClassifier(**params, n_estimators=n_rounds, n_jobs=threads, random_state=random_state, verbose=-1)
+        if params.get("boosting_type") == "dart":
+            # LightGBM does not support early stopping for dart, those candidates always use the full budget
+            model.fit(x.iloc[train_idx], y.iloc[train_idx])
+        else:
+            # Rounds are picked on a split of the training fold, the scored validation fold stays unseen
+            model.fit(x.iloc[fit_idx], y.iloc[fit_idx], eval_set=[(x.iloc[stop_idx], y.iloc[stop_idx])],
+                      callbacks=[lgb.early_stopping(early_stopping_rounds, verbose=False)])
+        scores.append(scorer(model, x.iloc[val_idx], y.iloc[val_idx]))
+        best_rounds.append(model.best_iteration_ or n_rounds)
+    return float(np.mean(scores)), int(round(np.mean(best_rounds)))
+
+class SuccessiveHalvingSearch:
+    def __init__(self, param_distributions, n_candidates=27, min_rounds=50, max_rounds=500, eta=3, cv=3,
+                 early_stopping_rounds=20, early_stopping_fraction=0.1, threads_per_worker=2, n_workers=None, scoring="accuracy", random_state=42):
+        self.param_distributions = {k: v for k, v in param_distributions.items() if k != "n_estimators"} #Boosting rounds are the budget
+        self.n_candidates = n_candidates
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.eta = eta
+        self.cv = cv
+        self.early_stopping_rounds = early_stopping_rounds
+        self.early_stopping_fraction = early_stopping_fraction
+        self.threads_per_worker = threads_per_worker
+        # Workers x threads per worker stays within the machine's cores
+        self.n_workers = n_workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.scoring = scoring
+        self.random_state = random_state
+        self.history = []
+
+    def fit(self, x, y):
+        # x stays a DataFrame so the fitted model keeps the feature names used by serving
+        candidates = list(ParameterSampler(self.param_distributions, n_iter=self.n_candidates, random_state=self.random_state))
+        folds = []
+        for train_idx, val_idx in StratifiedKFold(n_splits=self.cv, shuffle=True, random_state=self.random_state).split(x, y):
+            fit_idx, stop_idx = train_test_split(train_idx, test_size=self.early_stopping_fraction, stratify=y.iloc[train_idx],
+                                                 random_state=self.random_state)
+            folds.append((train_idx, fit_idx, stop_idx, val_idx))
+        logger.info(f"Successive halving over {len(candidates)} candidates with {self.n_workers} workers x {self.threads_per_worker} threads")
+
+        rung = 0
+        with ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker, initargs=(x, y, folds, self.threads_per_worker)) as executor:
+            while True:
+                n_rounds = min(self.max_rounds, self.min_rounds * self.eta ** rung)
+                started = time.perf_counter()
+                results = list(executor.map(
+                    _evaluate_candidate, candidates, [n_rounds] * len(candidates), [self.early_stopping_rounds] * len(candidates),
+                    [self.scoring] * len(candidates), [self.random_state] * len(candidates)
+                ))
+                for params, (score, best_round) in zip(candidates, results):
+                    self.history.append({"rung": rung, "n_rounds": n_rounds, "params": params, "score": score, "best_round": best_round})
+                logger.info(f"Rung {rung}: {len(candidates)} candidates x {n_rounds} rounds in {time.perf_counter() - started:.1f}s, best score {max(r[0] for r in results):.4f}")
+
+                order = np.argsort([-score for score, _ in results], kind="stable")
+                keep = max(1, math.ceil(len(candidates) / self.eta))
+                if keep == 1 or n_rounds >= self.max_rounds:
+                    best = order[0]
+                    self.best_params_ = candidates[best]
+                    self.best_score_ = results[best][0]
+                    self.best_n_estimators_ = results[best][1] #Early stopping already found the round count to refit with
+                    break
+                candidates = [candidates[i] for i in order[:keep]]
+                rung += 1
+
+        logger.info(f"Refitting best candidate with {self.best_n_estimators_} rounds on the full training set")
+        self.best_estimator_ = lgb.LGBMClassifier(**self.best_params_, n_estimators=self.best_n_estimators_, random_state=self.random_state, verbose=-1)
+        self.best_estimator_.fit(x, y)
+        return self
@@ -0,0 +1,74 @@
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+def row_hashes(df):
+    # One 64-bit hash per row (features + target), stable across runs
+    return pd.util.hash_pandas_object(df, index=False).to_numpy()
+
+def reference_distribution(x, n_bins=10):
+    # Quantile bin edges and bin shares per feature, kept from the last full training run
+    reference = {}
+    for col in x.columns:
+        values = x[col].to_numpy(dtype=np.float64)
+        edges = np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1]))
+        counts = np.bincount(np.searchsorted(edges, values, side="right"), minlength=len(edges) + 1)
+        reference[col] = {"edges": edges.tolist(), "shares": (counts / len(values)).tolist()}
+    return reference
+
+def population_stability_index(reference, x, eps=1e-6):
+    psi = {}
+    for col, ref in reference.items():
+        if col not in x.columns:
+            continue
+        edges = np.asarray(ref["edges"])
+        expected = np.asarray(ref["shares"]) + eps
+        counts = np.bincount(np.searchsorted(edges, x[col].to_numpy(dtype=np.float64), side="right"), minlength=len(edges) + 1)
+        actual = counts / max(len(x), 1) + eps
+        psi[col] = float(np.sum((actual - expected) * np.log(actual / expected)))
+    return psi
+
+class TrainingState:
+    # Everything the next run needs to train incrementally: which rows the model has seen, its metrics and the data reference
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.hashes_path = os.path.splitext(state_path)[0] + "_row_hashes.npy"
+        self.metrics = None
+        self.reference = None
+        self.mode = None
+        self.trained_at = None
+        self.version = None #Registry version the state was saved with
+        self.row_hashes = np.array([], dtype=np.uint64)
+
+    def exists(self):
+        return os.path.exists(self.state_path) and os.path.exists(self.hashes_path)
+
+    def load(self):
+        with open(self.state_path) as f:
+            state = json.load(f)
+        self.metrics = state["metrics"]
+        self.reference = state["reference"]
+        self.mode = state["mode"]
+        self.trained_at = state["trained_at"]
+        self.version = state.get("version")
+        self.row_hashes = np.load(self.hashes_path)
+        logger.info(f"Loaded training state from {self.state_path} ({len(self.row_hashes)} rows seen, last run {self.mode})")
+        return self
+
+    def save(self, metrics, reference, mode, row_hashes, version=None):
+        self.metrics, self.reference, self.mode, self.version = metrics, reference, mode, version
+        self.trained_at = time.time()
+        self.row_hashes = np.unique(row_hashes) #Sorted, so new rows are found with a binary search
+        os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        np.save(self.hashes_path, self.row_hashes)
+        with open(self.state_path, "w") as f:
+            json.dump({"metrics": metrics, "reference": reference, "mode": mode, "trained_at": self.trained_at, "version": version}, f, indent=2)
+        logger.info(f"Training state saved to {self.state_path}")
+
+    def new_rows_mask(self, df):
+        return ~np.isin(row_hashes(df), self.row_hashes, assume_unique=False)
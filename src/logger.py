@@ -2,11 +2,17 @@ import logging
 import os
 from datetime import datetime
 
-LOGS_DIR = "logs"
-os.makedirs(LOGS_DIR, exist_ok=True)
+LOGS_DIR = os.environ.get("LOGS_DIR", "logs")
 LOG_FILE = os.path.join(LOGS_DIR, f"log_{datetime.now().strftime('%y-%m-%d')}.log")
+
+class LazyFileHandler(logging.FileHandler):
+    # The logs directory and file are created by the first record, not as a side effect of importing the logger
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        return super()._open()
+
 logging.basicConfig(
-    filename=LOG_FILE,
+    handlers=[LazyFileHandler(LOG_FILE, delay=True)],
     format='%(asctime)s - %(levelname)s - %(message)s',
     level=logging.INFO
 )
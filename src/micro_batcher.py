@@ -0,0 +1,124 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+import numpy as np
+from src.logger import get_logger
+from config.serving_config import BATCH_WINDOW_MS, BATCH_MAX_ROWS, METRICS_WINDOW
+
+logger = get_logger(__name__)
+
+class LatencyStats:
+    def __init__(self, window=METRICS_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window) #Rolling window so percentiles follow current load
+        self._batch_sizes = deque(maxlen=window)
+        self.total_requests = 0
+        self.total_batches = 0
+
+    def record_batch(self, batch_size, latencies_ms):
+        with self._lock:
+            self._batch_sizes.append(batch_size)
+            self._latencies.extend(latencies_ms)
+            self.total_batches += 1
+            self.total_requests += batch_size
+
+    def snapshot(self):
+        with self._lock:
+            latencies = np.array(self._latencies, dtype=np.float64)
+            batch_sizes = np.array(self._batch_sizes, dtype=np.float64)
+            total_requests, total_batches = self.total_requests, self.total_batches
+        stats = {"requests": total_requests, "batches": total_batches}
+        if len(latencies):
+            p50, p99 = np.percentile(latencies, [50, 99])
+            stats.update({"latency_p50_ms": round(p50, 3), "latency_p99_ms": round(p99, 3), "latency_max_ms": round(latencies.max(), 3)})
+        if len(batch_sizes):
+            stats.update({"batch_size_mean": round(batch_sizes.mean(), 2), "batch_size_p50": float(np.percentile(batch_sizes, 50)), "batch_size_max": int(batch_sizes.max())})
+        return stats
+
+class MicroBatcher:
+    def __init__(self, predict_fn, max_wait_ms=BATCH_WINDOW_MS, max_batch_rows=BATCH_MAX_ROWS):
+        self.predict_fn = predict_fn #Takes a 2D feature matrix, returns (predictions, probabilities)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.stats = LatencyStats()
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        logger.info(f"Micro-batching enabled with window {max_wait_ms} ms and max {max_batch_rows} rows")
+
+    def _running(self):
+        return self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive()
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own scheduler on first use;
+        # a scheduler that stopped (closed, or died on an unexpected error) is restarted on the next request
+        if self._running():
+            return
+        with self._lock:
+            if not self._running():
+                if self._worker_pid != os.getpid():
+                    self._queue = queue.Queue() #Requests queued in the parent belong to the parent
+                self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                self._worker_pid = os.getpid()
+                self._worker.start()
+
+    def submit(self, row):
+        self._ensure_started()
+        future = Future()
+        self._queue.put((np.asarray(row, dtype=np.float64).reshape(-1), time.perf_counter(), future))
+        return future
+
+    def predict(self, row, timeout=None):
+        return self.submit(row).result(timeout=timeout)
+
+    def close(self):
+        # Stops the scheduler once the rows queued before the call are scored (used when a swapped-out model retires)
+        if self._worker is not None and self._worker_pid == os.getpid():
+            self._queue.put(None)
+
+    def _collect(self):
+        first = self._queue.get() #Block until the first request arrives, then open the window
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_rows:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None) #Stop after this batch
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            try:
+                rows = np.vstack([item[0] for item in batch]) #Inside the try: a row of the wrong width fails the batch, not the scheduler
+                predictions, probabilities = self.predict_fn(rows)
+            except Exception as e:
+                logger.error(f"Error while scoring micro-batch of {len(batch)} rows: {e}")
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            done = time.perf_counter()
+            for i, (_, submitted, future) in enumerate(batch):
+                future.set_result((predictions[i], probabilities[i]))
+            self.stats.record_batch(len(batch), [(done - submitted) * 1000.0 for _, submitted, _ in batch])
+
+    def metrics(self):
+        stats = self.stats.snapshot()
+        stats.update({"window_ms": self.max_wait * 1000.0, "max_batch_rows": self.max_batch_rows, "queue_depth": self._queue.qsize()})
+        return stats
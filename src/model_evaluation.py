@@ -0,0 +1,157 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+METRICS = ["accuracy", "precision", "recall", "f1_score", "roc_auc"]
+
+def _divide(num, den):
+    num, den = np.asarray(num, dtype=np.float64), np.asarray(den, dtype=np.float64)
+    return np.divide(num, den, out=np.zeros(np.broadcast(num, den).shape), where=den > 0) #0 where undefined, like zero_division=0
+
+def metrics_from_counts(tp, fp, fn, tn):
+    # Works on scalars and on arrays of counts (one per bootstrap sample or per segment)
+    precision = _divide(tp, tp + fp)
+    recall = _divide(tp, tp + fn)
+    return {
+        "accuracy": _divide(tp + tn, tp + fp + fn + tn),
+        "precision": precision,
+        "recall": recall,
+        "f1_score": _divide(2 * precision * recall, precision + recall)
+    }
+
+def roc_auc(y_true, scores):
+    # Mann-Whitney U on average ranks (ties count half), equal to roc_auc_score on probabilities
+    y_true = np.asarray(y_true).astype(bool)
+    n_pos = y_true.sum()
+    n_neg = len(y_true) - n_pos
+    if n_pos == 0 or n_neg == 0:
+        return np.nan
+    ranks = rankdata(scores)
+    return float((ranks[y_true].sum() - n_pos * (n_pos + 1) / 2) / (n_pos * n_neg))
+
+def binary_metrics(y_true, scores, threshold=0.5):
+    y_true = np.asarray(y_true).astype(bool)
+    y_pred = np.asarray(scores) > threshold
+    tp = np.sum(y_true & y_pred)
+    fp = np.sum(~y_true & y_pred)
+    fn = np.sum(y_true & ~y_pred)
+    tn = np.sum(~y_true & ~y_pred)
+    metrics = {name: float(value) for name, value in metrics_from_counts(tp, fp, fn, tn).items()}
+    metrics["roc_auc"] = roc_auc(y_true, scores)
+    return metrics
+
+# Float64 (batch, n) arrays alive at once at the peak of a bootstrap batch: the weights and their score-ordered copy,
+# a product and the per-tie sums, which are as wide as the data when the scores are distinct
+BOOTSTRAP_BATCH_COPIES = 6
+
+def bootstrap_metrics(y_true, scores, n_samples=1000, threshold=0.5, memory_budget_mb=256, random_state=42):
+    # Every resample is a row of multinomial weights, so all metrics of a batch of resamples are matrix sums
+    # instead of n_samples re-indexed copies of the data; AUC uses weighted ranks over the score order.
+    # The batch size follows from the memory budget, so large test sets run more, smaller batches
+    y_true = np.asarray(y_true).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    y_pred = scores > threshold
+    n = len(y_true)
+    batch_size = max(1, int(memory_budget_mb * 2**20) // (8 * n * BOOTSTRAP_BATCH_COPIES))
+    rng = np.random.default_rng(random_state)
+    order = np.argsort(scores, kind="mergesort")
+    sorted_scores = scores[order]
+    tie_starts = np.flatnonzero(np.r_[True, sorted_scores[1:] != sorted_scores[:-1]])
+    pos_sorted = y_true[order].astype(np.float64)
+    cells = {"tp": y_true & y_pred, "fp": ~y_true & y_pred, "fn": y_true & ~y_pred, "tn": ~y_true & ~y_pred}
+
+    results = {name: [] for name in METRICS}
+    for start in range(0, n_samples, batch_size):
+        weights = rng.multinomial(n, np.full(n, 1.0 / n), size=min(batch_size, n_samples - start)).astype(np.float64)
+        counts = {name: weights @ cell for name, cell in cells.items()}
+        for name, values in metrics_from_counts(**counts).items():
+            results[name].append(values)
+        weights = weights[:, order] #Replaces the unordered weights instead of keeping both
+        pos = np.add.reduceat(weights * pos_sorted, tie_starts, axis=1) #Weighted positives per tied score
+        neg = np.add.reduceat(weights, tie_starts, axis=1) - pos
+        del weights
+        neg_below = np.cumsum(neg, axis=1) - neg
+        results["roc_auc"].append(_divide((pos * (neg_below + 0.5 * neg)).sum(axis=1), pos.sum(axis=1) * neg.sum(axis=1)))
+    return {name: np.concatenate(values) for name, values in results.items()}
+
+def confidence_intervals(samples, confidence=0.95):
+    alpha = (1 - confidence) / 2
+    return {name: (float(np.quantile(values, alpha)), float(np.quantile(values, 1 - alpha))) for name, values in samples.items()}
+
+def segment_metrics(y_true, scores, segments, threshold=0.5, n_jobs=None, labels=None):
+    # Confusion counts of every segment in one bincount each; per-segment AUCs run on a thread pool
+    y_true = np.asarray(y_true).astype(bool)
+    scores = np.asarray(scores, dtype=np.float64)
+    y_pred = scores > threshold
+    codes, uniques = pd.factorize(pd.Series(segments), sort=True)
+    n_segments = len(uniques)
+    counts = {
+        "tp": np.bincount(codes, weights=y_true & y_pred, minlength=n_segments),
+        "fp": np.bincount(codes, weights=~y_true & y_pred, minlength=n_segments),
+        "fn": np.bincount(codes, weights=y_true & ~y_pred, minlength=n_segments),
+        "tn": np.bincount(codes, weights=~y_true & ~y_pred, minlength=n_segments)
+    }
+    table = pd.DataFrame(metrics_from_counts(**counts))
+    table.insert(0, "rows", np.bincount(codes, minlength=n_segments))
+    members = np.argsort(codes, kind="stable")
+    groups = np.split(members, np.cumsum(np.bincount(codes, minlength=n_segments))[:-1])
+    with ThreadPoolExecutor(max_workers=None if n_jobs in (None, -1) else n_jobs) as executor:
+        table["roc_auc"] = list(executor.map(lambda idx: roc_auc(y_true[idx], scores[idx]), groups))
+    table.index = [labels.get(u, u) if labels else u for u in uniques]
+    return table
+
+def _fit_and_score(estimator, x, y, train_idx, val_idx, threshold):
+    model = clone(estimator)
+    model.fit(x.iloc[train_idx], y.iloc[train_idx])
+    return binary_metrics(y.iloc[val_idx], model.predict_proba(x.iloc[val_idx])[:, 1], threshold)
+
+class ModelEvaluator:
+    def __init__(self, threshold=0.5, bootstrap_samples=1000, confidence=0.95, segment_column=None, segment_labels=None,
+                 cv_folds=0, n_jobs=None, bootstrap_memory_mb=256, random_state=42):
+        self.threshold = threshold
+        self.bootstrap_samples = bootstrap_samples
+        self.confidence = confidence
+        self.segment_column = segment_column
+        self.segment_labels = segment_labels #code -> readable name, e.g. from the FeatureTransformer category map
+        self.cv_folds = cv_folds
+        self.n_jobs = n_jobs
+        self.bootstrap_memory_mb = bootstrap_memory_mb
+        self.random_state = random_state
+
+    def scores(self, model, x):
+        return model.predict_proba(x)[:, 1]
+
+    def evaluate(self, model, x, y, scores=None):
+        # One predict_proba per dataset; every metric, interval and segment below reuses it
+        scores = self.scores(model, x) if scores is None else scores
+        return binary_metrics(y, scores, self.threshold), scores
+
+    def report(self, model, x, y):
+        started = time.perf_counter()
+        metrics, scores = self.evaluate(model, x, y)
+        report = {"metrics": metrics}
+        if self.bootstrap_samples:
+            samples = bootstrap_metrics(y, scores, self.bootstrap_samples, self.threshold, self.bootstrap_memory_mb, self.random_state)
+            report["confidence_intervals"] = confidence_intervals(samples, self.confidence)
+        if self.segment_column and self.segment_column in x.columns:
+            labels = self.segment_labels.get(self.segment_column) if self.segment_labels else None
+            report["segments"] = segment_metrics(y, scores, x[self.segment_column], self.threshold, self.n_jobs, labels)
+        logger.info(f"Evaluation report on {len(y)} rows took {time.perf_counter() - started:.2f}s")
+        return report
+
+    def cross_validate(self, estimator, x, y):
+        # Folds are independent fits, run in parallel processes with one LightGBM thread each
+        from joblib import Parallel, delayed
+        folds = StratifiedKFold(n_splits=self.cv_folds, shuffle=True, random_state=self.random_state).split(x, y)
+        estimator = clone(estimator).set_params(n_jobs=1) if "n_jobs" in estimator.get_params() else estimator
+        results = Parallel(n_jobs=self.n_jobs or -1)(
+            delayed(_fit_and_score)(estimator, x, y, train_idx, val_idx, self.threshold) for train_idx, val_idx in folds
+        )
+        return pd.DataFrame(results)
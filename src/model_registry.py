@@ -0,0 +1,243 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+from src.logger import get_logger
+from src.custom_exception import CustomException
+from utils.common_function import replace_path
+from config.paths_config import MODEL_REGISTRY_DIR, MODEL_OUTPUT_PATH, COMPILED_MODEL_DIR, PREPROCESSOR_PATH
+
+logger = get_logger(__name__)
+
+# Layout of a version directory. The compiled trees are .npy arrays that load memory-mapped, model.pkl is the
+# LightGBM estimator for incremental training and the pickle serving path
+MODEL_FILE = "model.pkl"
+COMPILED_DIR = "compiled"
+PREPROCESSOR_FILE = "preprocessor.json"
+METADATA_FILE = "metadata.json"
+
+# Where promote() copies the CURRENT version for the readers of artifacts/models (batch scoring, no-registry serving)
+SERVED_PATHS = {"model": MODEL_OUTPUT_PATH, "compiled": COMPILED_MODEL_DIR, "preprocessor": PREPROCESSOR_PATH}
+
+def preprocessing_fingerprint(preprocessor_path):
+    # Hash of the fitted transformer state (vocabularies, skew transforms, selected features), independent of JSON formatting
+    with open(preprocessor_path) as f:
+        state = json.load(f)
+    return hashlib.sha256(json.dumps(state, sort_keys=True).encode()).hexdigest()[:16]
+
+class ModelRegistry:
+    # Local, file based registry: immutable version directories plus CURRENT / SHADOW pointer files.
+    # Pointers are replaced atomically (os.replace), so readers see the old or the new version, never a partial write
+    def __init__(self, root=MODEL_REGISTRY_DIR, served_paths=None):
+        self.root = root
+        self.served_paths = served_paths #None leaves the served copy alone, e.g. for a registry outside artifacts
+        self.versions_dir = os.path.join(root, "versions")
+        self.current_path = os.path.join(root, "CURRENT")
+        self.shadow_path = os.path.join(root, "SHADOW")
+        self.history_path = os.path.join(root, "history.jsonl")
+
+    def version_dir(self, version):
+        return os.path.join(self.versions_dir, version)
+
+    def paths(self, version):
+        version_dir = self.version_dir(version)
+        return {
+            "model": os.path.join(version_dir, MODEL_FILE),
+            "compiled": os.path.join(version_dir, COMPILED_DIR),
+            "preprocessor": os.path.join(version_dir, PREPROCESSOR_FILE),
+            "metadata": os.path.join(version_dir, METADATA_FILE)
+        }
+
+    def list_versions(self):
+        if not os.path.isdir(self.versions_dir):
+            return []
+        return sorted(name for name in os.listdir(self.versions_dir) if name.startswith("v"))
+
+    def metadata(self, version):
+        with open(self.paths(version)["metadata"]) as f:
+            return json.load(f)
+
+    def register(self, model_path, compiled_dir, preprocessor_path, feature_names, metrics=None, tags=None):
+        # Files are copied into a staging directory that is renamed into place, so a version is complete or absent
+        try:
+            missing = [f for f in feature_names if f not in self._selected_features(preprocessor_path)]
+            if missing:
+                raise ValueError(f"Model features {missing} are not produced by the preprocessor {preprocessor_path}")
+            os.makedirs(self.versions_dir, exist_ok=True)
+            staging = os.path.join(self.versions_dir, f".staging-{uuid.uuid4().hex}")
+            os.makedirs(staging)
+            shutil.copy2(model_path, os.path.join(staging, MODEL_FILE))
+            if compiled_dir and os.path.isdir(compiled_dir):
+                shutil.copytree(compiled_dir, os.path.join(staging, COMPILED_DIR))
+            shutil.copy2(preprocessor_path, os.path.join(staging, PREPROCESSOR_FILE))
+
+            while True:
+                versions = self.list_versions()
+                version = f"v{int(versions[-1][1:]) + 1 if versions else 1:04d}"
+                metadata = {
+                    "version": version,
+                    "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "metrics": {name: float(value) for name, value in (metrics or {}).items()},
+                    "feature_names": list(feature_names),
+                    "preprocessing_fingerprint": preprocessing_fingerprint(preprocessor_path),
+                    "compiled": os.path.isdir(os.path.join(staging, COMPILED_DIR)),
+                    "tags": tags or {}
+                }
+                with open(os.path.join(staging, METADATA_FILE), "w") as f:
+                    json.dump(metadata, f, indent=2)
+                try:
+                    os.rename(staging, self.version_dir(version))
+                    break
+                except OSError:
+                    if not os.path.exists(self.version_dir(version)):
+                        raise
+                    #Another process registered the same number first, take the next one
+            logger.info(f"Registered model version {version} (preprocessing {metadata['preprocessing_fingerprint']})")
+            return version
+        except Exception as e:
+            logger.error(f"Error while registering the model: {e}")
+            raise CustomException("Failed to register the model version", e)
+
+    def _selected_features(self, preprocessor_path):
+        with open(preprocessor_path) as f:
+            return json.load(f).get("selected_features") or []
+
+    def verify(self, version):
+        # The preprocessor shipped with the version must still be the one the model was trained behind
+        metadata = self.metadata(version)
+        fingerprint = preprocessing_fingerprint(self.paths(version)["preprocessor"])
+        if fingerprint != metadata["preprocessing_fingerprint"]:
+            raise ValueError(f"Preprocessor of {version} has fingerprint {fingerprint}, expected {metadata['preprocessing_fingerprint']}")
+        return metadata
+
+    def _read_pointer(self, path):
+        try:
+            with open(path) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _write_pointer(self, path, version):
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(version + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def current_version(self):
+        return self._read_pointer(self.current_path)
+
+    def shadow_version(self):
+        return self._read_pointer(self.shadow_path)
+
+    def promote(self, version):
+        try:
+            self.verify(version)
+            previous = self.current_version()
+            self.publish(version)
+            self._write_pointer(self.current_path, version)
+            with open(self.history_path, "a") as f:
+                f.write(json.dumps({"version": version, "previous": previous, "promoted_at": time.strftime("%Y-%m-%dT%H:%M:%S")}) + "\n")
+            if self.shadow_version() == version:
+                self.set_shadow(None) #A promoted candidate no longer needs shadow traffic
+            logger.info(f"Promoted model version {version} (previous {previous})")
+            return previous
+        except Exception as e:
+            logger.error(f"Error while promoting {version}: {e}")
+            raise CustomException(f"Failed to promote model version {version}", e)
+
+    def publish(self, version):
+        # Each file is copied beside its served path and moved into place, compiled trees first since serving prefers them
+        if not self.served_paths:
+            return
+        source = self.paths(version)
+        for name in ("compiled", "model", "preprocessor"):
+            target = self.served_paths[name]
+            if not os.path.exists(source[name]):
+                shutil.rmtree(target, ignore_errors=True) #Version without compiled trees, the old ones must not be served with its pickle
+                continue
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            tmp_path = f"{target}.{os.getpid()}.tmp"
+            try:
+                if os.path.isdir(source[name]):
+                    shutil.copytree(source[name], tmp_path)
+                else:
+                    shutil.copy2(source[name], tmp_path)
+                replace_path(tmp_path, target)
+            finally:
+                if os.path.isdir(tmp_path):
+                    shutil.rmtree(tmp_path, ignore_errors=True)
+                elif os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        logger.info(f"Published model version {version} to {os.path.dirname(self.served_paths['model'])}")
+
+    def rollback(self):
+        # Back to the version that was current before the last promotion
+        try:
+            history = []
+            if os.path.exists(self.history_path):
+                with open(self.history_path) as f:
+                    history = [json.loads(line) for line in f if line.strip()]
+            previous = history[-1]["previous"] if history else None
+            if previous is None:
+                raise ValueError(f"No previous version in {self.history_path}")
+        except Exception as e:
+            logger.error(f"Error while rolling back: {e}")
+            raise CustomException("Failed to roll back the model version", e)
+        self.promote(previous)
+        return previous
+
+    def set_shadow(self, version):
+        if version is None:
+            if os.path.exists(self.shadow_path):
+                os.remove(self.shadow_path)
+            logger.info("Shadow scoring disabled")
+            return
+        self.verify(version)
+        self._write_pointer(self.shadow_path, version)
+        logger.info(f"Model version {version} set as shadow")
+
+    def prune(self, keep):
+        # Oldest versions beyond keep are deleted, except the ones a pointer refers to
+        protected = {self.current_version(), self.shadow_version()}
+        removable = [v for v in self.list_versions() if v not in protected]
+        removed = removable[:max(len(removable) - keep, 0)]
+        for version in removed:
+            shutil.rmtree(self.version_dir(version), ignore_errors=True)
+        if removed:
+            logger.info(f"Pruned model versions {removed}")
+        return removed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and promote versions of the local model registry")
+    parser.add_argument("--root", default=MODEL_REGISTRY_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("list", help="Versions with their metrics; * marks CURRENT, s marks SHADOW")
+    commands.add_parser("promote", help="Point CURRENT at a version and copy it to artifacts/models; servers swap to it on their next poll").add_argument("version")
+    commands.add_parser("rollback", help="Point CURRENT back at the version before the last promotion")
+    shadow = commands.add_parser("shadow", help="Score live traffic with a version without serving its predictions")
+    shadow.add_argument("version", nargs="?", help="Omit to stop shadow scoring")
+    commands.add_parser("prune", help="Delete the oldest unreferenced versions").add_argument("keep", type=int)
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.root, served_paths=SERVED_PATHS if args.root == MODEL_REGISTRY_DIR else None)
+    if args.command == "list":
+        from src.model_evaluation import METRICS
+        current, shadow_version = registry.current_version(), registry.shadow_version()
+        for version in registry.list_versions():
+            metadata = registry.metadata(version)
+            marker = "*" if version == current else "s" if version == shadow_version else " "
+            metrics = ", ".join(f"{name}={value:.4f}" for name, value in metadata["metrics"].items() if name in METRICS)
+            print(f"{marker} {version}  {metadata['created_at']}  {metadata['preprocessing_fingerprint']}  {metrics}")
+    elif args.command == "promote":
+        registry.promote(args.version)
+    elif args.command == "rollback":
+        print(f"Rolled back to {registry.rollback()}")
+    elif args.command == "shadow":
+        registry.set_shadow(args.version)
+    elif args.command == "prune":
+        print(f"Removed {registry.prune(args.keep)}")
@@ -1,28 +1,58 @@
 import os
+import shutil
 import pandas as pd
 import joblib
 from sklearn.model_selection import RandomizedSearchCV
 import lightgbm as lgb
-from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
-from config.paths_config import MODEL_OUTPUT_PATH
 from config.model_params import *
 from src.logger import get_logger
 from src.custom_exception import CustomException
 from config.paths_config import *
 from scipy.stats import randint, uniform
 from utils.common_function import *
+from src.compiled_model import CompiledForest
+from src.hyperparameter_search import SuccessiveHalvingSearch
+from src.model_evaluation import ModelEvaluator
+from src.model_registry import ModelRegistry, SERVED_PATHS
+from src.feature_transformer import FeatureTransformer
+from src.balancing import ChunkedSMOTE
+from src.incremental_training import TrainingState, reference_distribution, population_stability_index, row_hashes
+from utils.profiler import profile_stage, profiler
+from utils.mlflow_logger import AsyncMLflowLogger
+import numpy as np
 import mlflow
 
 logger = get_logger(__name__)
 
 class ModelTraining:
-    def __init__(self, train_path,test_path,model_output_path):
+    def __init__(self, train_path,test_path,model_output_path,compiled_model_dir=CANDIDATE_COMPILED_DIR,incremental=False,preprocessor_path=PROCESSED_PREPROCESSOR_PATH,real_train_path=PROCESSED_REAL_TRAIN_PATH):
         self.train_path = train_path
         self.test_path = test_path
-        self.model_output_path = model_output_path
+        self.real_train_path = real_train_path #Training rows before SMOTE
+        self.model_output_path = model_output_path #Candidate; it is only served once the registry promotes it
+        self.compiled_model_dir = compiled_model_dir
+        self.preprocessor_path = preprocessor_path #Fitted with the processed data this model trains on
+        self.incremental = incremental
+        self.incremental_params = INCREMENTAL_PARAMS
+        self.balancing_config = read_yaml(CONFIG_PATH)["data_processing"]["balancing"]
+        self.training_state = TrainingState(TRAINING_STATE_PATH)
         self.params_dist = LIGHTGMM_PARAMS
         self.random_search_params = RANDOM_SEARCH_PARAMS
+        self.search_strategy = SEARCH_STRATEGY
+        self.halving_search_params = HALVING_SEARCH_PARAMS
+        self.evaluation_params = EVALUATION_PARAMS
+        self.evaluator = ModelEvaluator(segment_labels=self.load_segment_labels(), **EVALUATION_PARAMS)
+        self.registry = ModelRegistry(MODEL_REGISTRY_DIR, served_paths=SERVED_PATHS)
+        self.registry_params = REGISTRY_PARAMS
+        self.mlflow_logging_params = MLFLOW_LOGGING_PARAMS
+        self.run_id = None
         
+    def load_segment_labels(self):
+        # Category codes -> names from the fitted transformer, so segment metrics read "Online" rather than 4
+        if not os.path.exists(self.preprocessor_path):
+            return None
+        transformer = FeatureTransformer.load(self.preprocessor_path)
+        return {col: dict(enumerate(categories)) for col, categories in transformer.category_maps.items()}
     def load_and_split_data(self):
         try:
             logger.info(f"Loading data from {self.train_path} and {self.test_path}...")
@@ -39,8 +69,31 @@ class ModelTraining:
         except Exception as e:
             logger.error(f"Error in loading and splitting data: {e}")
             raise CustomException("Error while loading and splitting data", e)
+    def load_real_train(self):
+        # The training state hashes real rows only: synthetic SMOTE rows change with every resample
+        try:
+            real_df = load_data(self.real_train_path)
+            return real_df.drop(columns=['booking_status']), real_df['booking_status']
+        except Exception as e:
+            logger.error(f"Error in loading the real training rows: {e}")
+            raise CustomException("Error while loading the real training rows", e)
+    def balance_new_rows(self, x_new, y_new):
+        # Same oversampling as the processing stage, applied to the new real rows only
+        if y_new.nunique() < 2:
+            return x_new, y_new
+        smote = ChunkedSMOTE(
+            k_neighbors=self.balancing_config["k_neighbors"],
+            chunk_size=self.balancing_config["chunk_size"],
+            n_jobs=self.balancing_config["n_jobs"],
+            random_state=42
+        )
+        return smote.fit_resample(x_new, y_new)
             
+    @profile_stage()
     def train_lgbm(self,x_train, y_train):
+        profiler.set_rows(len(x_train))
+        if self.search_strategy == 'halving':
+            return self.train_lgbm_halving(x_train, y_train)
         try:
             logger.info("Starting LightGBM model training...")
             lgbm_model = lgb.LGBMClassifier(random_state=42) 
@@ -67,68 +120,218 @@ class ModelTraining:
         except Exception as e:
             logger.error("Error in model training: %s", str(e))
             raise CustomException("Error while training the model", e)
+    def train_lgbm_halving(self, x_train, y_train):
+        try:
+            logger.info("Starting LightGBM model training with successive halving search...")
+            search = SuccessiveHalvingSearch(param_distributions=self.params_dist, **self.halving_search_params)
+            search.fit(x_train, y_train)
+            logger.info("Best parameters found: %s", search.best_params_)
+            logger.info("Best score: %f", search.best_score_)
+            logger.info("Model training completed.")
+            return search.best_estimator_
+        except Exception as e:
+            logger.error("Error in model training: %s", str(e))
+            raise CustomException("Error while training the model", e)
+    @profile_stage()
+    def train_incremental(self, x_real, y_real, x_test, y_test):
+        # Returns the updated model, or None when a full retrain is needed
+        try:
+            params = self.incremental_params
+            current = self.registry.current_version()
+            if current is None or not self.training_state.exists():
+                logger.info("No promoted model or training state, running a full retrain")
+                return None
+            state = self.training_state.load()
+            if state.version != current:
+                logger.info(f"Training state belongs to {state.version} but {current} is promoted, running a full retrain")
+                return None
+            previous_model = joblib.load(self.registry.paths(current)["model"])
+            if list(previous_model.feature_name_) != list(x_real.columns):
+                logger.info("Selected features changed since the last run, running a full retrain")
+                return None
+
+            new_mask = state.new_rows_mask(x_real.assign(booking_status=y_real))
+            n_new = int(new_mask.sum())
+            logger.info(f"{n_new} of {len(x_real)} real training rows are new since the last run")
+            if n_new == 0:
+                logger.info("No new rows, keeping the previous model")
+                return previous_model
+            if n_new / len(x_real) > params['max_new_fraction']:
+                logger.info("Too many new rows for an incremental update, running a full retrain")
+                return None
+
+            psi = population_stability_index(state.reference, x_real[new_mask])
+            worst_feature = max(psi, key=psi.get)
+            logger.info(f"Highest drift on new rows: {worst_feature} PSI {psi[worst_feature]:.4f}")
+            if psi[worst_feature] > params['max_psi']:
+                logger.info("Drift above threshold, running a full retrain")
+                return None
+
+            x_new, y_new = self.balance_new_rows(x_real[new_mask], y_real[new_mask])
+            logger.info(f"Continuing boosting for {params['extra_rounds']} rounds on {len(x_new)} new rows after balancing...")
+            model = lgb.LGBMClassifier(**{**previous_model.get_params(), 'n_estimators': params['extra_rounds']})
+            model.fit(x_new, y_new, init_model=previous_model.booster_)
+
+            # Both models are scored on today's held-out set; the stored metrics are logged for the run over run view
+            metric = params['metric']
+            previous_score = self.evaluate_model(previous_model, x_test, y_test)[metric]
+            new_score = self.evaluate_model(model, x_test, y_test)[metric]
+            logger.info(f"{metric}: previous model {previous_score:.4f}, incremental model {new_score:.4f}, last run {state.metrics.get(metric)}")
+            if previous_score - new_score > params['max_degradation']:
+                logger.info("Incremental model regressed beyond the threshold, running a full retrain")
+                return None
+            return model
+        except Exception as e:
+            logger.error("Error in incremental training: %s", str(e))
+            raise CustomException("Error while training the model incrementally", e)
+    def save_training_state(self, metrics, mode, x_real, y_real, version):
+        try:
+            hashes = row_hashes(x_real.assign(booking_status=y_real))
+            if mode == "incremental":
+                # Drift stays measured against the last full retrain
+                reference = self.training_state.reference
+                hashes = np.concatenate([self.training_state.row_hashes, hashes])
+            else:
+                reference = reference_distribution(x_real)
+            self.training_state.save(metrics, reference, mode, hashes, version)
+        except Exception as e:
+            logger.error("Error in saving the training state: %s", str(e))
+            raise CustomException("Error while saving the training state", e)
     def evaluate_model(self, model, x_test, y_test):
         try:
             logger.info("Starting model evaluation...")
-            y_pred = model.predict(x_test)
-            accuracy = accuracy_score(y_test, y_pred)
-            f1 = f1_score(y_test, y_pred)
-            precision = precision_score(y_test, y_pred)
-            recall = recall_score(y_test, y_pred)
-            roc_auc = roc_auc_score(y_test, y_pred)
-            
+            metrics, _ = self.evaluator.evaluate(model, x_test, y_test) #One predict_proba; ROC AUC is computed on the probabilities
             logger.info("Model evaluation completed.")
-            logger.info("Accuracy: %f", accuracy)
-            logger.info("F1 Score: %f", f1)
-            logger.info("Precision: %f", precision)
-            logger.info("Recall: %f", recall)
-            logger.info("ROC AUC Score: %f", roc_auc)
-            
-            return {
-                'accuracy': accuracy,
-                'f1_score': f1,
-                'precision': precision,
-                'recall': recall,
-                'roc_auc': roc_auc
-            }
+            logger.info("Accuracy: %f", metrics['accuracy'])
+            logger.info("F1 Score: %f", metrics['f1_score'])
+            logger.info("Precision: %f", metrics['precision'])
+            logger.info("Recall: %f", metrics['recall'])
+            logger.info("ROC AUC Score: %f", metrics['roc_auc'])
+            return metrics
         except Exception as e:
             logger.error("Error in model evaluation: %s", str(e))
             raise CustomException("Error while evaluating the model", e)
-    def save_model(self, model):
+    @profile_stage()
+    def evaluation_report(self, model, x_train, y_train, x_test, y_test):
+        # Flat metrics for MLflow: test metrics, bootstrap intervals, per-segment metrics and cross-validated means
+        try:
+            report = self.evaluator.report(model, x_test, y_test)
+            metrics = dict(report["metrics"])
+            for name, (low, high) in report.get("confidence_intervals", {}).items():
+                metrics[f"{name}_ci_low"], metrics[f"{name}_ci_high"] = low, high
+            if "segments" in report:
+                logger.info("Metrics per %s:\n%s", self.evaluator.segment_column, report["segments"].round(4).to_string())
+                for segment, row in report["segments"].iterrows():
+                    for name, value in row.items():
+                        metrics[f"{self.evaluator.segment_column}.{segment}.{name}"] = float(value)
+            if self.evaluator.cv_folds:
+                folds = self.evaluator.cross_validate(model, x_train, y_train)
+                logger.info("Cross-validated metrics:\n%s", folds.describe().loc[["mean", "std"]].round(4).to_string())
+                for name in folds.columns:
+                    metrics[f"cv_{name}_mean"], metrics[f"cv_{name}_std"] = folds[name].mean(), folds[name].std()
+            return {name: value for name, value in metrics.items() if not np.isnan(value)}
+        except Exception as e:
+            logger.error("Error in the evaluation report: %s", str(e))
+            raise CustomException("Error while building the evaluation report", e)
+    def save_model(self, model, x_check=None):
+        # The pickle and the compiled trees are written and checked beside the candidate files, then moved into place
+        # (compiled trees first): a failed export never leaves a pickle next to trees of another model
         try:
             os.makedirs(os.path.dirname(self.model_output_path), exist_ok=True)
             logger.info("Saving the trained model...")
-            joblib.dump(model, self.model_output_path)
+            tmp_model_path = f"{self.model_output_path}.{os.getpid()}.tmp"
+            tmp_compiled_dir = f"{self.compiled_model_dir}.{os.getpid()}.tmp"
+            try:
+                joblib.dump(model, tmp_model_path)
+                if x_check is not None:
+                    self.export_compiled_model(model, x_check, tmp_compiled_dir)
+                    replace_path(tmp_compiled_dir, self.compiled_model_dir)
+                else:
+                    shutil.rmtree(self.compiled_model_dir, ignore_errors=True) #Trees of an older model must not be served next to this pickle
+                os.replace(tmp_model_path, self.model_output_path)
+            finally:
+                if os.path.exists(tmp_model_path):
+                    os.remove(tmp_model_path)
+                shutil.rmtree(tmp_compiled_dir, ignore_errors=True)
             logger.info(f"Model saved to {self.model_output_path}.")
         except Exception as e:
             logger.error("Error in saving the model: %s", str(e))
             raise CustomException("Error while saving the model", e)
+    def export_compiled_model(self, model, x_check, output_dir=None, tolerance=1e-6):
+        try:
+            logger.info("Compiling the model trees into numpy arrays...")
+            compiled = CompiledForest.from_lgbm(model)
+            # The compiled trees must reproduce predict_proba before they are allowed to replace the pickle at serving time
+            max_diff = np.abs(compiled.predict_proba(x_check)[:, 1] - model.predict_proba(x_check)[:, 1]).max()
+            logger.info("Max probability difference between compiled and LightGBM model: %g", max_diff)
+            if max_diff > tolerance:
+                raise ValueError(f"Compiled model differs from LightGBM by {max_diff}, above tolerance {tolerance}")
+            compiled.save(output_dir or self.compiled_model_dir)
+            logger.info(f"Compiled model saved to {output_dir or self.compiled_model_dir}.")
+        except Exception as e:
+            logger.error("Error in compiling the model: %s", str(e))
+            raise CustomException("Error while compiling the model", e)
+    def register_model(self, model, metrics, training_mode):
+        # Every trained model becomes a registry version; servers and artifacts/models only get it once it is promoted
+        try:
+            version = self.registry.register(self.model_output_path, self.compiled_model_dir, self.preprocessor_path, list(model.feature_name_),
+                                             metrics=metrics, tags={"training_mode": training_mode})
+            policy = self.registry_params["promote"]
+            metric = self.registry_params["metric"]
+            current = self.registry.current_version()
+            promoted = False
+            if policy == "always" or (policy == "if_better" and current is None):
+                promoted = True
+            elif policy == "if_better":
+                current_score = self.registry.metadata(current)["metrics"].get(metric, -np.inf)
+                promoted = metrics[metric] >= current_score + self.registry_params["min_improvement"]
+                if not promoted:
+                    logger.info(f"Version {version} not promoted: {metric} {metrics[metric]:.4f} vs {current_score:.4f} for {current}")
+                    if self.registry_params["shadow_rejected"]:
+                        self.registry.set_shadow(version) #Compared with the served model on live traffic instead
+            if promoted:
+                self.registry.promote(version)
+            self.registry.prune(self.registry_params["keep_versions"])
+            return version, promoted
+        except Exception as e:
+            logger.error("Error in registering the model: %s", str(e))
+            raise CustomException("Error while registering the model", e)
     def run(self):
         try:
-            with mlflow.start_run():
+            with mlflow.start_run() as run, AsyncMLflowLogger(run.info.run_id, **self.mlflow_logging_params) as tracker:
                 logger.info("Starting MLFlow Experiment...")
-            logger.info("Starting model training process...")
-            logger.info("Loading the dataset to MLFLOW")
-            mlflow.log_artifact(self.train_path, artifact_path="artifacts") #Inside MLFlow Datasets folder will be created and train and test data will be saved inside it
-            mlflow.log_artifact(self.test_path, artifact_path="artifacts")
-            x_train, y_train, x_test, y_test = self.load_and_split_data()
-            # Remove this duplicate line:
-            # x_train, y_train, x_test, y_test = self.load_and_split_data()
-            best_lgbm_model = self.train_lgbm(x_train, y_train)
-            self.evaluate_model(best_lgbm_model, x_test, y_test)
-            self.save_model(best_lgbm_model)
-            mlflow.log_artifact(self.model_output_path) #Logging the best model to MLFlow
-            logger.info("Logging the Model to MLFlow is completed")
-            mlflow.log_params(best_lgbm_model.get_params()) #Logging the model parameters to MLFlow
-            logger.info("Logging model metrics to MLFlow...")
-            mlflow.log_metrics(self.evaluate_model(best_lgbm_model, x_test, y_test))
-            logger.info("Model metrics logged to MLFlow.")
-            logger.info("Model training process completed.")
+                self.run_id = run.info.run_id
+                logger.info("Starting model training process...")
+                logger.info("Loading the dataset to MLFLOW")
+                # Uploaded in the background while the model trains; a dataset uploaded before with the same content is only referenced
+                tracker.log_artifact(self.train_path, artifact_path="artifacts") #Inside MLFlow Datasets folder will be created and train and test data will be saved inside it
+                tracker.log_artifact(self.test_path, artifact_path="artifacts")
+                x_train, y_train, x_test, y_test = self.load_and_split_data()
+                x_real, y_real = self.load_real_train()
+                # Remove this duplicate line:
+                # x_train, y_train, x_test, y_test = self.load_and_split_data()
+                best_lgbm_model = self.train_incremental(x_real, y_real, x_test, y_test) if self.incremental else None
+                training_mode = "incremental" if best_lgbm_model is not None else "full"
+                if best_lgbm_model is None:
+                    best_lgbm_model = self.train_lgbm(x_train, y_train)
+                metrics = self.evaluation_report(best_lgbm_model, x_train, y_train, x_test, y_test)
+                self.save_model(best_lgbm_model, x_test)
+                tracker.log_artifact(self.model_output_path) #Logging the best model to MLFlow
+                model_version, promoted = self.register_model(best_lgbm_model, metrics, training_mode)
+                if promoted:
+                    self.save_training_state(metrics, training_mode, x_real, y_real, model_version) #The next incremental run continues the served model
+                logger.info(f"Model trained in {training_mode} mode")
+                #Logging the model parameters to MLFlow
+                tracker.log_params({**best_lgbm_model.get_params(), "training_mode": training_mode, "model_version": model_version, "promoted": promoted})
+                logger.info("Logging model metrics to MLFlow...")
+                tracker.log_metrics(metrics) #Computed once above, not re-predicted for logging
+                logger.info("Model training process completed.")
+            # Leaving the with block waited for the queued params / metrics / uploads before the run was marked finished
         except Exception as e:
             logger.error("Error in model training process: %s", str(e))
             raise CustomException("Error while running the model training process", e)
 if __name__ == "__main__":
-    model_training = ModelTraining(PROCESSED_TRAIN_PATH, PROCESSED_TEST_PATH, MODEL_OUTPUT_PATH)
+    model_training = ModelTraining(PROCESSED_TRAIN_PATH, PROCESSED_TEST_PATH, CANDIDATE_MODEL_PATH)
     model_training.run()
     print(f"MODEL_OUTPUT_PATH: {MODEL_OUTPUT_PATH}")    
         
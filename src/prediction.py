@@ -0,0 +1,78 @@
+import time
+import numpy as np
+import pandas as pd
+from src.logger import get_logger
+from config.serving_config import MAX_BATCH_SIZE
+
+logger = get_logger(__name__)
+
+class BatchPredictor:
+    def __init__(self, model, transformer=None, max_batch_size=MAX_BATCH_SIZE):
+        self.model = model
+        self.transformer = transformer #Fitted FeatureTransformer, lets clients send raw values like "Meal Plan 1"
+        self.max_batch_size = max_batch_size
+        self.feature_names = list(model.feature_name_) #Column order the model was trained with
+
+    def parse_payload(self, payload):
+        # Accepts {"records": [{...}, ...]}, a bare list of records, or a columnar {"columns": {name: [values]}}
+        if isinstance(payload, list):
+            records = payload
+        elif isinstance(payload, dict) and "records" in payload:
+            records = payload["records"]
+        elif isinstance(payload, dict) and "columns" in payload:
+            records = None
+        else:
+            raise ValueError("Payload must be a list of records, {'records': [...]} or {'columns': {...}}")
+
+        if records is not None:
+            if not isinstance(records, list) or not all(isinstance(r, dict) for r in records):
+                raise ValueError("'records' must be a list of objects")
+            df = pd.DataFrame.from_records(records)
+        else:
+            columns = payload["columns"]
+            if not isinstance(columns, dict) or not all(isinstance(v, list) for v in columns.values()):
+                raise ValueError("'columns' must map feature names to lists of values")
+            lengths = {len(v) for v in columns.values()}
+            if len(lengths) > 1:
+                raise ValueError("All columns must have the same length")
+            df = pd.DataFrame(columns)
+        return self.validate(df)
+
+    def validate(self, df):
+        if len(df) == 0:
+            raise ValueError("No records to score")
+        if len(df) > self.max_batch_size:
+            raise ValueError(f"Batch of {len(df)} records exceeds the maximum of {self.max_batch_size}")
+        if self.transformer is not None:
+            df = self.transformer.transform_features(df)
+        missing = [col for col in self.feature_names if col not in df.columns]
+        if missing:
+            raise ValueError(f"Missing features: {missing}")
+
+        # Convert every feature column at once and report all offending rows in one error
+        features = df[self.feature_names].apply(pd.to_numeric, errors="coerce")
+        invalid = features.isna()
+        if invalid.values.any():
+            bad_rows = np.flatnonzero(invalid.values.any(axis=1))
+            bad_cols = features.columns[invalid.values.any(axis=0)].tolist()
+            raise ValueError(f"Non-numeric or missing values in columns {bad_cols} at rows {bad_rows[:20].tolist()}")
+        return features.to_numpy(dtype=np.float64)
+
+    def sample_record(self):
+        # One valid raw record: the first known category for categorical columns, 0 elsewhere
+        features = self.transformer.selected_features if self.transformer is not None else self.feature_names
+        categories = self.transformer.category_maps if self.transformer is not None else {}
+        return {col: categories[col][0] if col in categories else 0 for col in features}
+
+    def warm_up(self):
+        # Runs validate + predict once so first-call setup happens before traffic arrives
+        started = time.perf_counter()
+        self.predict(self.validate(pd.DataFrame([self.sample_record()])))
+        return (time.perf_counter() - started) * 1000
+
+    def predict(self, features):
+        # One vectorized call for the whole batch; labels are derived from the same probabilities
+        probabilities = self.model.predict_proba(features)[:, 1]
+        predictions = (probabilities > 0.5).astype(int) #Same tie-break as LGBMClassifier.predict (argmax)
+        logger.info(f"Scored batch of {len(features)} records")
+        return predictions, probabilities
@@ -0,0 +1,193 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Keys per SELECT ... IN (...), below SQLite's host parameter limit (999 before 3.32)
+SQLITE_MAX_KEYS_PER_QUERY = 500
+
+# name -> backend class, constructed with (max_entries, ttl_seconds, **options)
+CACHE_BACKENDS = {}
+
+def register_cache_backend(name):
+    def decorator(cls):
+        CACHE_BACKENDS[name] = cls
+        return cls
+    return decorator
+
+@register_cache_backend("memory")
+class MemoryBackend:
+    # Per-process LRU: an OrderedDict in recency order, entries older than ttl_seconds are treated as missing
+    def __init__(self, max_entries=10000, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        values = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None or now - entry[0] > self.ttl_seconds:
+                    if entry is not None:
+                        del self._entries[key]
+                    values.append(None)
+                    continue
+                self._entries.move_to_end(key)
+                values.append(entry[1])
+        return values
+
+    def set_many(self, items):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in items.items():
+                self._entries[key] = (now, value)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+@register_cache_backend("sqlite")
+class SQLiteBackend:
+    # One database file shared by every worker on the host; WAL lets readers and a writer work concurrently
+    def __init__(self, max_entries=10000, ttl_seconds=300, path="/tmp/prediction_cache.sqlite", prune_every=500):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.path = path
+        self.prune_every = prune_every
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS predictions (key BLOB PRIMARY KEY, prediction INTEGER, probability REAL, created REAL, used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used)")
+
+    def _connect(self):
+        # sqlite connections must not cross threads or a fork, so each thread of each process opens its own
+        if getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return self._local.conn
+
+    def get_many(self, keys):
+        conn = self._connect()
+        now = time.time()
+        found = {}
+        for start in range(0, len(keys), SQLITE_MAX_KEYS_PER_QUERY):
+            chunk = keys[start:start + SQLITE_MAX_KEYS_PER_QUERY]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(f"SELECT key, prediction, probability FROM predictions WHERE key IN ({placeholders}) AND created > ?",
+                                [*chunk, now - self.ttl_seconds]).fetchall()
+            found.update((key, (prediction, probability)) for key, prediction, probability in rows)
+        if found:
+            with conn:
+                conn.executemany("UPDATE predictions SET used = ? WHERE key = ?", [(now, key) for key in found])
+        return [found.get(key) for key in keys]
+
+    def set_many(self, items):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?, ?)",
+                             [(key, int(prediction), float(probability), now, now) for key, (prediction, probability) in items.items()])
+        self._writes += len(items)
+        if self._writes >= self.prune_every:
+            self._writes = 0
+            self.prune()
+
+    def prune(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM predictions WHERE created <= ?", (time.time() - self.ttl_seconds,))
+            conn.execute("DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY used DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM predictions")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM predictions").fetchone()[0]
+
+class PredictionCache:
+    def __init__(self, backend="memory", model_path=None, max_entries=10000, ttl_seconds=300, check_interval=1.0, **backend_options):
+        if backend not in CACHE_BACKENDS:
+            raise ValueError(f"Unknown prediction cache backend '{backend}', expected one of {list(CACHE_BACKENDS)}")
+        self.backend_name = backend
+        self.backend = CACHE_BACKENDS[backend](max_entries=max_entries, ttl_seconds=ttl_seconds, **backend_options)
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._model_version = self._read_model_version()
+
+    def _read_model_version(self):
+        if self.model_path is None or not os.path.exists(self.model_path):
+            return ""
+        stat = os.stat(self.model_path)
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def model_version(self):
+        # The model file is stat'ed at most once per check_interval; a new file drops every cached result
+        now = time.monotonic()
+        if now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            version = self._read_model_version()
+            if version != self._model_version:
+                logger.info(f"Model file {self.model_path} changed, clearing the prediction cache")
+                self._model_version = version
+                self.backend.clear()
+                with self._lock:
+                    self.invalidations += 1
+        return self._model_version
+
+    def keys(self, features):
+        # Canonical key: the validated float64 feature vector (+0.0 folds -0.0 into 0.0) plus the model version
+        features = np.ascontiguousarray(features, dtype=np.float64) + 0.0
+        version = self.model_version().encode()
+        return [hashlib.blake2b(version + row.tobytes(), digest_size=16).digest() for row in features]
+
+    def predict(self, features, predict_fn):
+        # Only rows that are not cached are passed to predict_fn, which returns (predictions, probabilities)
+        keys = self.keys(features)
+        cached = self.backend.get_many(keys)
+        missing = [i for i, value in enumerate(cached) if value is None]
+        with self._lock:
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        predictions = np.empty(len(keys), dtype=np.int64)
+        probabilities = np.empty(len(keys), dtype=np.float64)
+        for i, value in enumerate(cached):
+            if value is not None:
+                predictions[i], probabilities[i] = value
+        if missing:
+            new_predictions, new_probabilities = predict_fn(features[missing])
+            predictions[missing] = new_predictions
+            probabilities[missing] = new_probabilities
+            self.backend.set_many({keys[i]: (int(predictions[i]), float(probabilities[i])) for i in missing})
+        return predictions, probabilities
+
+    def metrics(self):
+        total = self.hits + self.misses
+        return {"backend": self.backend_name, "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else None,
+                "invalidations": self.invalidations, "entries": len(self.backend)}
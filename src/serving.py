@@ -0,0 +1,290 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from config.paths_config import MODEL_OUTPUT_PATH, COMPILED_MODEL_DIR, PREPROCESSOR_PATH, MODEL_REGISTRY_DIR
+from config.serving_config import MICRO_BATCHING, USE_COMPILED_MODEL, COLD_START_BUDGET_SECONDS, MODEL_POLL_SECONDS, SHADOW_MAX_PENDING
+from config.serving_config import PREDICTION_CACHE, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL_SECONDS, PREDICTION_CACHE_PATH
+from src.prediction import BatchPredictor
+from src.feature_transformer import FeatureTransformer
+from src.micro_batcher import LatencyStats
+from src.model_registry import ModelRegistry
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Form inputs whose name differs from the model feature name
+FORM_FIELD_ALIASES = {"no_of_special_request": "no_of_special_requests"}
+
+def load_model(use_compiled=USE_COMPILED_MODEL, model_path=MODEL_OUTPUT_PATH, compiled_dir=COMPILED_MODEL_DIR):
+    # Returns the model and the file whose change means a new model was exported
+    if use_compiled and os.path.isdir(compiled_dir):
+        from src.compiled_model import CompiledForest
+        return CompiledForest.load(compiled_dir), os.path.join(compiled_dir, "meta.json") #Memory-mapped arrays, rewritten with meta.json on every export
+    import joblib #Pulls in lightgbm/sklearn/scipy through the pickle, only needed without the compiled model
+    return joblib.load(model_path), model_path
+
+class ServingModel:
+    # One model version with its transformer, micro-batcher and prediction cache, shared by the Flask and the asyncio server
+    def __init__(self, started=None, version=None, registry=None, batching=MICRO_BATCHING, cache=PREDICTION_CACHE):
+        started = started or time.perf_counter()
+        self.version = version #Registry version, None for the model in artifacts/models
+        if version is not None:
+            registry.verify(version)
+            paths = registry.paths(version)
+            self.model, self.model_file = load_model(USE_COMPILED_MODEL, paths["model"], paths["compiled"])
+            preprocessor_path = paths["preprocessor"] #The transformer the version was trained behind, not the latest one
+        else:
+            self.model, self.model_file = load_model()
+            preprocessor_path = PREPROCESSOR_PATH
+        self.transformer = FeatureTransformer.load(preprocessor_path) if os.path.exists(preprocessor_path) else None
+        self.predictor = BatchPredictor(self.model, self.transformer)
+        if batching:
+            from src.micro_batcher import MicroBatcher
+            self.batcher = MicroBatcher(self.predictor.predict) #Its worker thread starts on first use, so it is never forked
+        else:
+            self.batcher = None
+        if cache != "off":
+            from src.prediction_cache import PredictionCache
+            backend_options = {"path": PREDICTION_CACHE_PATH} if cache == "sqlite" else {}
+            # Keyed on this version's model file, so entries of another version are never returned
+            self.prediction_cache = PredictionCache(cache, model_path=self.model_file, max_entries=PREDICTION_CACHE_SIZE,
+                                                    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS, **backend_options)
+        else:
+            self.prediction_cache = None
+        self.active = 0 #Requests using this model right now; a swapped-out model is closed when it reaches 0
+
+        # Warmed once per process; under gunicorn (preload_app) this runs in the master before the workers fork
+        self.startup = {"model": type(self.model).__name__, "version": version, "warmup_ms": round(self.predictor.warm_up(), 3)}
+        self.startup["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Serving {self.startup['model']} {version or 'from artifacts/models'}, warm after {self.startup['seconds']}s")
+        if self.startup["seconds"] > COLD_START_BUDGET_SECONDS:
+            logger.warning(f"Cold start took {self.startup['seconds']}s, above the {COLD_START_BUDGET_SECONDS}s budget")
+
+    def validate_form(self, form):
+        record = {FORM_FIELD_ALIASES.get(name, name): value for name, value in form.items()}
+        return self.predictor.validate(pd.DataFrame([record])) #Raw categories are encoded by the fitted transformer
+
+    def score(self, features):
+        # Single rows go through the micro-batcher when it is on, batches are scored in one call
+        if self.batcher is not None and len(features) == 1:
+            prediction, probability = self.batcher.predict(features[0]) #Coalesced with other concurrent requests into one model call
+            return [prediction], [probability]
+        return self.predictor.predict(features)
+
+    def cached_score(self, features):
+        # Repeated feature vectors are answered from the cache, only the rest reach the model
+        if self.prediction_cache is not None:
+            return self.prediction_cache.predict(features, self.score)
+        return self.score(features)
+
+    def predict_form(self, form):
+        predictions, probabilities = self.cached_score(self.validate_form(form))
+        return predictions[0], probabilities[0]
+
+    def predict_payload(self, payload):
+        # JSON API body in, response dict out; raises ValueError for invalid payloads
+        predictions, probabilities = self.cached_score(self.predictor.parse_payload(payload))
+        return {
+            "predictions": [int(p) for p in predictions],
+            "probabilities": [float(p) for p in probabilities],
+            "count": len(predictions)
+        }
+
+    def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def ready(self):
+        return {"ready": True, "pid": os.getpid(), **self.startup}
+
+    def metrics(self):
+        return {
+            "micro_batching": self.batcher.metrics() if self.batcher is not None else None,
+            "prediction_cache": self.prediction_cache.metrics() if self.prediction_cache is not None else None
+        }
+
+class ShadowScorer:
+    # Scores a copy of live requests with a candidate version on a background thread and compares it with the answers
+    # the served model returned; its predictions never reach a client
+    def __init__(self, model, max_pending=SHADOW_MAX_PENDING):
+        self.model = model
+        self.max_pending = max_pending
+        self.latency = LatencyStats()
+        self.counts = {"requests": 0, "rows": 0, "disagreements": 0, "errors": 0, "dropped": 0}
+        self.abs_diff_sum = 0.0
+        self.max_abs_diff = 0.0
+        self.pending = 0
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+
+    def _ensure_started(self):
+        # Threads do not survive fork, so each worker process starts its own shadow thread on first use
+        if self._executor is not None and self._executor_pid == os.getpid():
+            return
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+                self._executor_pid = os.getpid()
+
+    def submit(self, kind, raw, served_probabilities):
+        self._ensure_started()
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.counts["dropped"] += 1 #Shadow traffic is best effort, it never slows down or queues behind live requests
+                return
+            self.pending += 1
+        self._executor.submit(self._score, kind, raw, np.asarray(served_probabilities, dtype=np.float64))
+
+    def _score(self, kind, raw, served):
+        started = time.perf_counter()
+        try:
+            features = self.model.validate_form(raw) if kind == "form" else self.model.predictor.parse_payload(raw)
+            _, probabilities = self.model.predictor.predict(features)
+            diff = np.abs(probabilities - served)
+            with self._lock:
+                self.counts["requests"] += 1
+                self.counts["rows"] += len(diff)
+                self.counts["disagreements"] += int(np.sum((probabilities > 0.5) != (served > 0.5)))
+                self.abs_diff_sum += float(diff.sum())
+                self.max_abs_diff = max(self.max_abs_diff, float(diff.max()))
+            self.latency.record_batch(len(diff), [(time.perf_counter() - started) * 1000.0])
+        except Exception as e:
+            with self._lock:
+                self.counts["errors"] += 1
+            logger.warning(f"Shadow scoring with {self.model.version} failed: {e}")
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+    def close(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False)
+
+    def metrics(self):
+        with self._lock:
+            rows = self.counts["rows"]
+            return {
+                "version": self.model.version, **self.counts, "pending": self.pending,
+                "disagreement_rate": round(self.counts["disagreements"] / rows, 4) if rows else None,
+                "mean_abs_diff": round(self.abs_diff_sum / rows, 6) if rows else None,
+                "max_abs_diff": round(self.max_abs_diff, 6),
+                "latency": self.latency.snapshot()
+            }
+
+class ModelServer:
+    # Serves the registry's CURRENT version (artifacts/models without a registry) and hot-swaps to a newly promoted one.
+    # The new version is loaded (memory-mapped) and warmed on a watcher thread, then replaces the served model in one
+    # reference swap; requests finish on the model they started with, and the old model is closed once they are done
+    def __init__(self, started=None, registry=None, poll_seconds=MODEL_POLL_SECONDS):
+        self.registry = registry or ModelRegistry(MODEL_REGISTRY_DIR)
+        self.poll_seconds = poll_seconds
+        self.current = ServingModel(started, version=self.registry.current_version(), registry=self.registry)
+        self.shadow = None
+        self.swaps = []
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+        try:
+            self.set_shadow(self.registry.shadow_version())
+        except Exception as e:
+            logger.error(f"Shadow model could not be loaded, serving without it: {e}")
+
+    def _ensure_watching(self):
+        # Started on the first request of each process, like the micro-batcher, so a preloading master never owns it
+        if not self.poll_seconds or (self._watcher is not None and self._watcher_pid == os.getpid()):
+            return
+        with self._lock:
+            if self._watcher is None or self._watcher_pid != os.getpid():
+                self._watcher = threading.Thread(target=self._watch, name="model-watcher", daemon=True)
+                self._watcher_pid = os.getpid()
+                self._watcher.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.poll_seconds)
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Model refresh failed, still serving {self.current.version}: {e}")
+
+    def refresh(self):
+        # One poll of the registry pointers: two small file reads
+        version = self.registry.current_version()
+        if version is not None and version != self.current.version:
+            self.swap(version)
+        shadow_version = self.registry.shadow_version()
+        if shadow_version != (self.shadow.model.version if self.shadow is not None else None):
+            self.set_shadow(shadow_version)
+
+    def swap(self, version):
+        model = ServingModel(version=version, registry=self.registry) #Loaded and warmed before any request can see it
+        with self._lock:
+            previous, self.current = self.current, model
+        self.swaps.append({"from": previous.version, "to": version, "at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                           "load_seconds": model.startup["seconds"]})
+        logger.info(f"Swapped model {previous.version} -> {version}")
+        self.retire(previous)
+
+    def retire(self, model, timeout=60.0):
+        deadline = time.monotonic() + timeout
+        while model.active and time.monotonic() < deadline:
+            time.sleep(0.05)
+        if model.active:
+            logger.warning(f"Model {model.version} still has {model.active} requests after {timeout}s, left open")
+            return
+        model.close()
+
+    def set_shadow(self, version):
+        previous = self.shadow
+        self.shadow = ShadowScorer(ServingModel(version=version, registry=self.registry, batching=False, cache="off")) if version else None
+        if previous is not None:
+            previous.close()
+        if version:
+            logger.info(f"Shadow scoring live traffic with {version}")
+
+    @contextmanager
+    def acquire(self):
+        self._ensure_watching()
+        with self._lock:
+            model = self.current
+            model.active += 1
+        try:
+            yield model
+        finally:
+            with self._lock:
+                model.active -= 1
+
+    def _shadow(self, kind, raw, probabilities):
+        shadow = self.shadow
+        if shadow is not None:
+            shadow.submit(kind, raw, probabilities)
+
+    def predict_form(self, form):
+        # Validation and scoring use the same model version, even if a swap happens in between
+        form = dict(form.items()) #Copied: the shadow thread reads it after the request is gone
+        with self.acquire() as model:
+            prediction, probability = model.predict_form(form)
+        self._shadow("form", form, [probability])
+        return prediction
+
+    def predict_payload(self, payload):
+        with self.acquire() as model:
+            response = model.predict_payload(payload)
+        self._shadow("payload", payload, response["probabilities"])
+        return response
+
+    def ready(self):
+        return self.current.ready()
+
+    def metrics(self):
+        current = self.current
+        return {
+            **current.metrics(),
+            "model": {"version": current.version, "model_file": current.model_file, "swaps": self.swaps[-10:]},
+            "shadow": self.shadow.metrics() if self.shadow is not None else None
+        }
@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+from imblearn.over_sampling import SMOTE
+from config.paths_config import CONFIG_PATH
+from src.balancing import ChunkedSMOTE
+from src.feature_selection import FeatureSelector
+from src.feature_transformer import FeatureTransformer
+from utils.common_function import read_yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_TRAIN_PATH = os.path.join(ROOT, "artifacts", "raw", "train.csv")
+
+@pytest.fixture(scope="module")
+def preprocessed_train():
+    config = read_yaml(os.path.join(ROOT, CONFIG_PATH))["data_processing"]
+    df = pd.read_csv(RAW_TRAIN_PATH).drop(columns=["Booking_ID"]).drop_duplicates()
+    transformer = FeatureTransformer.from_config(config)
+    transformer.fit(df)
+    df = transformer.transform(df)
+    return df.drop(columns=["booking_status"]), df["booking_status"], config["no_of_features"]
+
+def test_selected_features_match_imblearn_smote(preprocessed_train):
+    # The web form sends the features selected after imblearn's SMOTE; the chunked resampler must not change them
+    x, y, n_features = preprocessed_train
+    selector = FeatureSelector(backend="random_forest", use_cache=False)
+    expected = set(selector.select(*SMOTE(random_state=42).fit_resample(x, y), n_features))
+    for seed in (0, 42):
+        assert set(selector.select(*ChunkedSMOTE(random_state=seed).fit_resample(x, y), n_features)) == expected
+
+def test_resampled_columns_keep_compact_dtypes(preprocessed_train):
+    x, y, _ = preprocessed_train
+    x_resampled, y_resampled = ChunkedSMOTE().fit_resample(x, y)
+    assert y_resampled.value_counts().nunique() == 1
+    for col in x.columns:
+        if pd.api.types.is_integer_dtype(x[col]):
+            assert pd.api.types.is_integer_dtype(x_resampled[col])
+            assert x_resampled[col].min() >= x[col].min() and x_resampled[col].max() <= x[col].max()
+        else:
+            assert x_resampled[col].dtype == np.float32
+    pd.testing.assert_frame_equal(x_resampled.iloc[:len(x)].astype(x.dtypes), x.reset_index(drop=True))
+
+def test_single_sample_class_is_duplicated():
+    x = pd.DataFrame({"a": np.arange(10), "b": np.linspace(0, 1, 10)})
+    y = pd.Series([0] * 9 + [1])
+    x_resampled, y_resampled = ChunkedSMOTE().fit_resample(x, y)
+    assert (y_resampled == 1).sum() == 9
+    assert (x_resampled[y_resampled == 1] == [9, 1.0]).all().all()
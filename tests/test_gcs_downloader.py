@@ -0,0 +1,95 @@
+import json
+import os
+import pytest
+from src.custom_exception import CustomException
+from src.gcs_downloader import LocalBlob, LocalStorageClient, ParallelDownloader, md5_base64
+
+BUCKET = "bucket"
+BLOB = "HotelReservations.csv"
+CHUNK_MB = 0.25 #256 KiB chunks, the source below spans several of them
+CHUNK_SIZE = int(CHUNK_MB * 1024 * 1024)
+
+@pytest.fixture
+def source(tmp_path):
+    bucket_dir = tmp_path / "gcs" / BUCKET
+    bucket_dir.mkdir(parents=True)
+    path = bucket_dir / BLOB
+    path.write_bytes(os.urandom(CHUNK_SIZE * 4 + 1234)) #Last chunk is a partial one
+    return path
+
+@pytest.fixture
+def client(tmp_path):
+    return LocalStorageClient(str(tmp_path / "gcs"))
+
+@pytest.fixture
+def ranged_reads(monkeypatch):
+    # Records the start offset of every ranged read; failures maps a start offset to how many reads of it fail
+    record = {"starts": [], "failures": {}}
+    download_as_bytes = LocalBlob.download_as_bytes
+
+    def recording_download(self, start=None, end=None, if_generation_match=None):
+        record["starts"].append(start)
+        if record["failures"].get(start, 0) > 0:
+            record["failures"][start] -= 1
+            raise IOError(f"Injected failure at {start}")
+        return download_as_bytes(self, start=start, end=end, if_generation_match=if_generation_match)
+
+    monkeypatch.setattr(LocalBlob, "download_as_bytes", recording_download)
+    monkeypatch.setattr("src.gcs_downloader.time.sleep", lambda seconds: None) #No retry backoff in tests
+    return record
+
+def make_downloader(client, destination, max_workers=4, max_retries=3):
+    return ParallelDownloader(client, BUCKET, BLOB, str(destination), chunk_size_mb=CHUNK_MB, max_workers=max_workers, max_retries=max_retries)
+
+def test_multi_chunk_download_matches_source(client, source, ranged_reads, tmp_path):
+    destination = tmp_path / "raw" / "raw.csv"
+    assert make_downloader(client, destination).download() is True
+    assert destination.read_bytes() == source.read_bytes()
+    assert sorted(ranged_reads["starts"]) == list(range(0, source.stat().st_size, CHUNK_SIZE))
+    assert not os.path.exists(f"{destination}.part")
+    assert not os.path.exists(f"{destination}.part.json")
+
+def test_resumes_from_partial_part_file(client, source, ranged_reads, tmp_path):
+    destination = tmp_path / "raw.csv"
+    failing_start = 2 * CHUNK_SIZE
+    ranged_reads["failures"][failing_start] = 1
+    with pytest.raises(CustomException):
+        make_downloader(client, destination, max_workers=1, max_retries=1).download()
+    with open(f"{destination}.part.json") as f:
+        completed = set(json.load(f)["completed"])
+    assert completed and failing_start not in completed
+    assert os.path.exists(f"{destination}.part")
+
+    ranged_reads["starts"].clear()
+    assert make_downloader(client, destination).download() is True
+    assert destination.read_bytes() == source.read_bytes()
+    assert not completed & set(ranged_reads["starts"]) #Chunks already on disk are not fetched again
+    assert failing_start in ranged_reads["starts"]
+
+def test_skips_download_when_local_md5_matches(client, source, ranged_reads, tmp_path):
+    destination = tmp_path / "raw.csv"
+    destination.write_bytes(source.read_bytes()) #Copied in by hand, no metadata sidecar yet
+    assert make_downloader(client, destination).download() is False
+    assert ranged_reads["starts"] == []
+    with open(f"{destination}.meta.json") as f:
+        assert json.load(f)["md5_hash"] == md5_base64(str(source))
+
+def test_redownloads_when_local_copy_differs(client, source, ranged_reads, tmp_path):
+    destination = tmp_path / "raw.csv"
+    destination.write_bytes(b"x" * source.stat().st_size)
+    assert make_downloader(client, destination).download() is True
+    assert destination.read_bytes() == source.read_bytes()
+
+def test_retries_failed_chunk(client, source, ranged_reads, tmp_path):
+    destination = tmp_path / "raw.csv"
+    ranged_reads["failures"][CHUNK_SIZE] = 2
+    assert make_downloader(client, destination, max_retries=3).download() is True
+    assert destination.read_bytes() == source.read_bytes()
+    assert ranged_reads["starts"].count(CHUNK_SIZE) == 3
+
+def test_gives_up_after_max_retries(client, source, ranged_reads, tmp_path):
+    destination = tmp_path / "raw.csv"
+    ranged_reads["failures"][0] = 3
+    with pytest.raises(CustomException):
+        make_downloader(client, destination, max_retries=3).download()
+    assert not destination.exists()
@@ -1,4 +1,5 @@
 import os
+import shutil
 import yaml
 from src.logger import get_logger
 from src.custom_exception import CustomException
@@ -19,35 +20,82 @@ def read_yaml(filepath):
         logger.error("Error while reading logger file.", e)
         raise CustomException("Failed to read YAML file", e)
         
-# def load_data(file_path):
-#     try:
-#         # Check if the directory exists
-#         directory = os.path.dirname(file_path)
-#         if not os.path.exists(directory):
-#             os.makedirs(directory, exist_ok=True)
-#             logger.info(f"Created directory: {directory}")
-            
-#         logger.info(f"Reading CSV file: {file_path}")
-#         data = pd.read_csv(file_path)
-#         logger.info(f"Data loaded successfully from {file_path}")
-#         return data
-#     except PermissionError as e:
-#         logger.error(f"Permission denied while accessing {file_path}: {str(e)}")
-#         raise CustomException(f"Permission denied for file: {file_path}", e)
-#     except Exception as e:
-#         logger.error(f"Error loading data from {file_path}: {str(e)}")
-#         raise CustomException(f"Failed to load data from {file_path}", e)
-
-def load_data(file_path):
+def downcast_dtypes(df):
+    # Smallest integer type that holds each integer column, float32 for floats
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_integer_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], downcast="integer")
+        elif pd.api.types.is_float_dtype(df[col]):
+            df[col] = df[col].astype("float32")
+    return df
+
+def replace_path(src, dst):
+    # Moves a finished file or directory over dst; a directory is swapped by renaming the old one aside, then removing it
+    if not os.path.isdir(src):
+        os.replace(src, dst)
+        return
+    previous = f"{dst}.{os.getpid()}.old"
+    if os.path.exists(dst):
+        os.rename(dst, previous)
+    os.rename(src, dst)
+    shutil.rmtree(previous, ignore_errors=True)
+
+########## ARTIFACT STORE ############
+# Readers / writers per file extension. Every reader takes (file_path, columns, dtype) so stages can
+# project columns and pin dtypes whatever the format; new formats are added with register_artifact_format.
+# A dtype map may name columns the file or the projection does not have, those entries are ignored.
+
+def _pin_dtypes(data, dtype):
+    dtype = {col: col_dtype for col, col_dtype in (dtype or {}).items() if col in data.columns}
+    return data.astype(dtype) if dtype else data
+
+def _read_csv(file_path, columns=None, dtype=None):
+    return pd.read_csv(file_path, usecols=columns, dtype=dtype)
+
+def _write_csv(df, file_path):
+    df.to_csv(file_path, index=False)
+
+def _read_parquet(file_path, columns=None, dtype=None):
+    data = pd.read_parquet(file_path, columns=columns, memory_map=True)
+    return _pin_dtypes(data, dtype)
+
+def _write_parquet(df, file_path):
+    df.to_parquet(file_path, index=False)
+
+def _read_feather(file_path, columns=None, dtype=None):
+    from pyarrow import feather
+    # Uncompressed Feather is read straight from the memory-mapped file without a parse step
+    data = feather.read_table(file_path, columns=columns, memory_map=True).to_pandas()
+    return _pin_dtypes(data, dtype)
+
+def _write_feather(df, file_path):
+    from pyarrow import feather
+    feather.write_feather(df.reset_index(drop=True), file_path, compression="uncompressed")
+
+ARTIFACT_READERS = {".csv": _read_csv, ".parquet": _read_parquet, ".feather": _read_feather}
+ARTIFACT_WRITERS = {".csv": _write_csv, ".parquet": _write_parquet, ".feather": _write_feather}
+
+def register_artifact_format(extension, reader, writer):
+    ARTIFACT_READERS[extension] = reader
+    ARTIFACT_WRITERS[extension] = writer
+
+def get_artifact_extension(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension not in ARTIFACT_READERS:
+        raise ValueError(f"Unsupported artifact format '{extension}' for {file_path}")
+    return extension
+
+def load_data(file_path, columns=None, dtype=None):
     try:
         # Log the file being accessed
-        logger.info(f"Reading CSV file: {file_path}")
+        logger.info(f"Reading data file: {file_path}")
         
         # Ensure file exists before attempting to read
         if not os.path.isfile(file_path):
             raise FileNotFoundError(f"File does not exist: {file_path}")
         
-        data = pd.read_csv(file_path)
+        data = ARTIFACT_READERS[get_artifact_extension(file_path)](file_path, columns=columns, dtype=dtype)
         logger.info(f"Data loaded successfully from {file_path}")
         return data
 
@@ -59,4 +107,149 @@ def load_data(file_path):
         raise CustomException(str(e), e)
     except Exception as e:
         logger.error(f"Error loading data from {file_path}: {str(e)}")
-        raise CustomException(f"Failed to load data from {file_path}", e)
\ No newline at end of file
+        raise CustomException(f"Failed to load data from {file_path}", e)
+
+def save_data(df, file_path, dtype=None):
+    try:
+        logger.info(f"Writing data file: {file_path}")
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if dtype:
+            df = df.astype(dtype)
+        ARTIFACT_WRITERS[get_artifact_extension(file_path)](df, file_path)
+        logger.info(f"Data saved successfully to {file_path}")
+    except Exception as e:
+        logger.error(f"Error saving data to {file_path}: {str(e)}")
+        raise CustomException(f"Failed to save data to {file_path}", e)
+
+def iter_data(file_path, chunk_size=100000, columns=None, dtype=None):
+    # Yields DataFrames of at most chunk_size rows so callers never hold the whole file in memory
+    try:
+        if not os.path.isfile(file_path):
+            raise FileNotFoundError(f"File does not exist: {file_path}")
+        extension = get_artifact_extension(file_path)
+        logger.info(f"Streaming data file in chunks of {chunk_size} rows: {file_path}")
+        if extension == ".csv":
+            yield from pd.read_csv(file_path, usecols=columns, dtype=dtype, chunksize=chunk_size) #Pinned, a chunk cannot infer another type
+        elif extension == ".parquet":
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(file_path, memory_map=True).iter_batches(batch_size=chunk_size, columns=columns):
+                yield _pin_dtypes(batch.to_pandas(), dtype)
+        elif extension == ".feather":
+            import pyarrow as pa
+            with pa.memory_map(file_path) as source:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    batch = reader.get_batch(i)
+                    if columns:
+                        batch = batch.select(columns)
+                    for start in range(0, batch.num_rows, chunk_size):
+                        yield _pin_dtypes(batch.slice(start, chunk_size).to_pandas(), dtype)
+        else:
+            yield load_data(file_path, columns=columns, dtype=dtype) #Formats without a chunked reader are loaded whole
+    except FileNotFoundError as e:
+        logger.error(str(e))
+        raise CustomException(str(e), e)
+
+class ArtifactWriter:
+    # Appends DataFrame chunks to a CSV / Parquet / Feather artifact. The Arrow schema starts as the first chunk's and is
+    # promoted when a later chunk needs it (int -> float once a chunk has missing values, an all-missing column gaining a
+    # type); the rows already written are then copied once into a file with the promoted schema
+    def __init__(self, file_path, dtype=None):
+        self.file_path = file_path
+        self.extension = get_artifact_extension(file_path)
+        self.dtype = dtype
+        self.rows_written = 0
+        self._started = False
+        self._schema = None
+        self._sink = None
+        self._writer = None
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _chunk_table(self, df):
+        import pyarrow as pa
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for i, field in enumerate(table.schema):
+            if len(table) and table.column(i).null_count == len(table) and field.type != pa.null():
+                table = table.set_column(i, field.name, pa.nulls(len(table))) #All missing: pandas guessed float / object, the type is unknown
+        return table
+
+    def _open(self, schema):
+        import pyarrow as pa
+        self._schema = schema
+        if self.extension == ".parquet":
+            import pyarrow.parquet as pq
+            self._writer = pq.ParquetWriter(self.file_path, schema)
+        else:
+            self._sink = pa.OSFile(self.file_path, "wb")
+            self._writer = pa.ipc.new_file(self._sink, schema) #Feather v2 is the Arrow IPC file format
+
+    def _close_writer(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._sink is not None:
+            self._sink.close()
+        self._writer = self._sink = None
+
+    def _promote(self, schema):
+        import pyarrow as pa
+        logger.info(f"Promoting the schema of {self.file_path}, rewriting {self.rows_written} rows")
+        self._close_writer()
+        previous_path = f"{self.file_path}.{os.getpid()}.promote"
+        os.replace(self.file_path, previous_path)
+        self._open(schema)
+        if self.extension == ".parquet":
+            import pyarrow.parquet as pq
+            batches = pq.ParquetFile(previous_path).iter_batches()
+        else:
+            source = pa.memory_map(previous_path)
+            reader = pa.ipc.open_file(source)
+            batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+        for batch in batches:
+            self._writer.write_table(pa.Table.from_batches([batch]).cast(schema))
+        if self.extension != ".parquet":
+            source.close()
+        os.remove(previous_path)
+
+    def write(self, df):
+        try:
+            if self.dtype:
+                df = df.astype(self.dtype)
+            if self.extension == ".csv":
+                df.to_csv(self.file_path, mode="a" if self._started else "w", header=not self._started, index=False)
+            else:
+                import pyarrow as pa
+                table = self._chunk_table(df)
+                if self._schema is None:
+                    self._open(table.schema)
+                elif not table.schema.equals(self._schema):
+                    schema = pa.unify_schemas([self._schema, table.schema], promote_options="permissive")
+                    if not schema.equals(self._schema):
+                        self._promote(schema.remove_metadata()) #The pandas metadata of the first chunk would name stale dtypes
+                self._writer.write_table(table.select(self._schema.names).cast(self._schema))
+            self._started = True
+            self.rows_written += len(df)
+        except Exception as e:
+            logger.error(f"Error writing chunk to {self.file_path}: {str(e)}")
+            raise CustomException(f"Failed to write chunk to {self.file_path}", e)
+
+    def close(self):
+        self._close_writer()
+        if not self._started:
+            # Nothing was written: an empty artifact replaces whatever an earlier run left at this path
+            if self.extension == ".csv":
+                open(self.file_path, "w").close()
+            else:
+                import pyarrow as pa
+                self._open(pa.schema([]))
+                self._close_writer()
+        logger.info(f"{self.rows_written} rows written to {self.file_path}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
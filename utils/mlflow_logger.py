@@ -0,0 +1,226 @@
+import atexit
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from src.logger import get_logger
+from config.paths_config import MLFLOW_UPLOAD_INDEX_PATH
+
+logger = get_logger(__name__)
+
+# Limits of a single MlflowClient.log_batch call
+MAX_METRICS_PER_BATCH = 1000
+MAX_PARAMS_PER_BATCH = 100
+MAX_TAGS_PER_BATCH = 100
+
+def file_digest(file_path, chunk_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=20)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class UploadIndex:
+    # Content hash -> run and artifact path of its first upload, per tracking URI, shared by the runs on this machine
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def get(self, key):
+        with self._lock:
+            return self._read().get(key)
+
+    def put(self, key, value):
+        with self._lock:
+            index = self._read()
+            index[key] = value
+            os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+
+class AsyncMLflowLogger:
+    # Params, metrics and tags are queued and sent by a flusher thread in log_batch calls; artifacts upload on a thread pool.
+    # The caller only pays for an enqueue, so training never waits on the tracking server. close() (also run at exit)
+    # waits for everything queued. synchronous=True sends every call inline, the old behaviour, for comparison
+    def __init__(self, run_id, tracking_uri=None, synchronous=False, upload_workers=4, flush_interval=1.0,
+                 dedupe_artifacts=True, index_path=MLFLOW_UPLOAD_INDEX_PATH):
+        import mlflow
+        from mlflow.tracking import MlflowClient
+        self.run_id = run_id
+        self.tracking_uri = tracking_uri or mlflow.get_tracking_uri()
+        self.client = MlflowClient(self.tracking_uri)
+        self.synchronous = synchronous
+        self.flush_interval = flush_interval
+        self.dedupe_artifacts = dedupe_artifacts
+        self.index = UploadIndex(index_path)
+        self.stats = {"batches": 0, "metrics": 0, "params": 0, "tags": 0, "artifacts_uploaded": 0, "artifacts_deduplicated": 0,
+                      "bytes_uploaded": 0, "errors": 0, "blocked_seconds": 0.0, "background_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._uploads = []
+        self._closed = False
+        if not synchronous:
+            self._executor = ThreadPoolExecutor(max_workers=upload_workers, thread_name_prefix="mlflow-upload")
+            self._flusher = threading.Thread(target=self._run, name="mlflow-flusher", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                self.stats[name] += value
+
+    def _blocking(self, started):
+        self._count(blocked_seconds=time.perf_counter() - started)
+
+    def log_params(self, params):
+        from mlflow.entities import Param
+        started = time.perf_counter()
+        self._enqueue("params", [Param(str(key), str(value)) for key, value in params.items()])
+        self._blocking(started)
+
+    def log_metrics(self, metrics, step=0):
+        from mlflow.entities import Metric
+        started = time.perf_counter()
+        timestamp = int(time.time() * 1000)
+        self._enqueue("metrics", [Metric(str(key), float(value), timestamp, step) for key, value in metrics.items()])
+        self._blocking(started)
+
+    def set_tags(self, tags):
+        from mlflow.entities import RunTag
+        started = time.perf_counter()
+        self._enqueue("tags", [RunTag(str(key), str(value)) for key, value in tags.items()])
+        self._blocking(started)
+
+    def log_artifact(self, local_path, artifact_path=None):
+        started = time.perf_counter()
+        if self.synchronous:
+            self._upload(local_path, artifact_path)
+        else:
+            self._uploads.append(self._executor.submit(self._upload, local_path, artifact_path))
+        self._blocking(started)
+
+    def _enqueue(self, kind, items):
+        if self.synchronous:
+            self._send({"metrics": [], "params": [], "tags": [], kind: items})
+        else:
+            self._queue.put((kind, items))
+
+    def _send(self, pending):
+        # One log_batch per slice of at most the per-call limits
+        started = time.perf_counter()
+        metrics, params, tags = pending["metrics"], pending["params"], pending["tags"]
+        while metrics or params or tags:
+            try:
+                self.client.log_batch(self.run_id, metrics=metrics[:MAX_METRICS_PER_BATCH], params=params[:MAX_PARAMS_PER_BATCH],
+                                      tags=tags[:MAX_TAGS_PER_BATCH])
+                self._count(batches=1, metrics=len(metrics[:MAX_METRICS_PER_BATCH]), params=len(params[:MAX_PARAMS_PER_BATCH]),
+                            tags=len(tags[:MAX_TAGS_PER_BATCH]))
+            except Exception as e:
+                self._count(errors=1)
+                logger.error(f"Error while logging a batch to MLflow run {self.run_id}: {e}")
+            metrics, params, tags = metrics[MAX_METRICS_PER_BATCH:], params[MAX_PARAMS_PER_BATCH:], tags[MAX_TAGS_PER_BATCH:]
+        self._count(background_seconds=time.perf_counter() - started)
+
+    def _run(self):
+        # Collects queued items until the queue stays empty for flush_interval, a flush is requested or a batch is full
+        pending = {"metrics": [], "params": [], "tags": []}
+        while True:
+            try:
+                kind, item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                kind, item = "flush", None
+            if kind in pending:
+                pending[kind].extend(item)
+                if len(pending["metrics"]) < MAX_METRICS_PER_BATCH and len(pending["params"]) < MAX_PARAMS_PER_BATCH:
+                    continue
+            if any(pending.values()):
+                self._send(pending)
+                pending = {"metrics": [], "params": [], "tags": []}
+            if kind == "flush" and item is not None:
+                item.set()
+            elif kind == "stop":
+                item.set()
+                return
+
+    def _artifact_exists(self, run_id, path):
+        try:
+            return any(f.path == path for f in self.client.list_artifacts(run_id, os.path.dirname(path) or None))
+        except Exception:
+            return False
+
+    def _upload(self, local_path, artifact_path):
+        # A file whose content was already uploaded to this tracking store (e.g. an unchanged dataset) is referenced
+        # with a tag instead of being uploaded again
+        started = time.perf_counter()
+        tags = {}
+        try:
+            digest = file_digest(local_path)
+            path = os.path.join(artifact_path, os.path.basename(local_path)) if artifact_path else os.path.basename(local_path)
+            key = f"{self.tracking_uri}|{digest}"
+            previous = self.index.get(key) if self.dedupe_artifacts else None
+            tags[f"artifact_hash.{path}"] = digest
+            if previous is not None and self._artifact_exists(previous["run_id"], previous["path"]):
+                tags[f"artifact_source.{path}"] = f"runs:/{previous['run_id']}/{previous['path']}"
+                self._count(artifacts_deduplicated=1)
+                logger.info(f"{local_path} unchanged since run {previous['run_id']}, upload skipped")
+            else:
+                self.client.log_artifact(self.run_id, local_path, artifact_path)
+                self.index.put(key, {"run_id": self.run_id, "path": path})
+                self._count(artifacts_uploaded=1, bytes_uploaded=os.path.getsize(local_path))
+        except Exception as e:
+            self._count(errors=1)
+            logger.error(f"Error while uploading {local_path} to MLflow run {self.run_id}: {e}")
+        finally:
+            self._count(background_seconds=time.perf_counter() - started)
+        if tags:
+            self._enqueue("tags", [self._tag(name, value) for name, value in tags.items()])
+
+    def _tag(self, key, value):
+        from mlflow.entities import RunTag
+        return RunTag(key, value)
+
+    def flush(self, timeout=None):
+        # Blocks until every artifact queued so far is uploaded and every queued param / metric / tag is sent
+        if self.synchronous:
+            return
+        started = time.perf_counter()
+        wait(self._uploads, timeout=timeout)
+        self._uploads = [future for future in self._uploads if not future.done()]
+        done = threading.Event()
+        self._queue.put(("flush", done))
+        done.wait(timeout)
+        self._blocking(started)
+
+    def close(self, timeout=None):
+        if self._closed:
+            return
+        self._closed = True
+        atexit.unregister(self.close)
+        if not self.synchronous:
+            self.flush(timeout)
+            stopped = threading.Event()
+            self._queue.put(("stop", stopped))
+            stopped.wait(timeout)
+            self._executor.shutdown(wait=True)
+        stats = self.stats
+        logger.info(f"MLflow logging for run {self.run_id}: {stats['batches']} batches, {stats['artifacts_uploaded']} artifacts uploaded "
+                    f"({stats['bytes_uploaded'] / 2**20:.1f} MB), {stats['artifacts_deduplicated']} deduplicated, {stats['errors']} errors; "
+                    f"caller blocked {stats['blocked_seconds']:.3f}s for {stats['background_seconds']:.3f}s of logging work")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,142 @@
+import functools
+import json
+import os
+import resource
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from src.logger import get_logger
+
+logger = get_logger(__name__)
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+def current_rss_mb():
+    # /proc is cheap enough to poll; elsewhere fall back to the process high-water mark (KB on Linux)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def children_cpu_seconds():
+    # CPU of finished child processes (process pools), which process_time does not include
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+class _PeakRSSSampler(threading.Thread):
+    def __init__(self, interval):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, current_rss_mb())
+        return self.peak
+
+class StageProfiler:
+    def __init__(self, enabled=True, sample_interval_ms=50):
+        self.enabled = enabled
+        self.sample_interval_ms = sample_interval_ms
+        self.records = []
+        self._stack = []
+
+    def configure(self, enabled=True, sample_interval_ms=50, **kwargs):
+        self.enabled = enabled
+        self.sample_interval_ms = sample_interval_ms
+
+    def reset(self):
+        self.records = []
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        # Nested stages are recorded as parent.child, e.g. data_processing.balance_data
+        record = {"stage": f"{self._stack[-1]['stage']}.{name}" if self._stack else name, "rows": rows}
+        if not self.enabled:
+            yield record
+            return
+        self._stack.append(record)
+        sampler = _PeakRSSSampler(self.sample_interval_ms / 1000)
+        start_rss = sampler.peak
+        sampler.start()
+        started_wall, started_cpu, started_children = time.perf_counter(), time.process_time(), children_cpu_seconds()
+        record["status"] = "failed"
+        try:
+            yield record
+            record["status"] = "ok"
+        finally:
+            peak = sampler.stop()
+            self._stack.pop()
+            record.update({
+                "wall_seconds": round(time.perf_counter() - started_wall, 4),
+                "cpu_seconds": round(time.process_time() - started_cpu + children_cpu_seconds() - started_children, 4),
+                "peak_rss_mb": round(peak, 2),
+                "rss_delta_mb": round(current_rss_mb() - start_rss, 2),
+                "started_at": datetime.now().isoformat(timespec="seconds")
+            })
+            self.records.append(record)
+            logger.info(f"[profile] {record['stage']}: wall {record['wall_seconds']}s, cpu {record['cpu_seconds']}s, "
+                        f"peak rss {record['peak_rss_mb']} MB, rows {record['rows']}, {record['status']}")
+
+    def profile(self, name=None, rows=None):
+        # rows is an optional function of the return value, e.g. len for a DataFrame
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name or fn.__name__) as record:
+                    result = fn(*args, **kwargs)
+                    if rows is not None:
+                        record["rows"] = rows(result)
+                    return result
+            return wrapper
+        return decorator
+
+    def set_rows(self, rows):
+        # Row count for the innermost running stage, for steps that do not return their data
+        if self._stack:
+            self._stack[-1]["rows"] = int(rows)
+
+    def to_dict(self):
+        return {"created_at": datetime.now().isoformat(timespec="seconds"), "stages": self.records}
+
+    def save(self, file_path):
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        logger.info(f"Profile with {len(self.records)} stages saved to {file_path}")
+
+    def metrics(self, prefix="profile"):
+        # A step that runs more than once (preprocess_data on train and test) is summed, peak memory is the max
+        metrics = {}
+        for record in self.records:
+            for key in ("wall_seconds", "cpu_seconds", "peak_rss_mb", "rows", "cached"):
+                if record.get(key) is None:
+                    continue
+                name = f"{prefix}.{record['stage']}.{key}"
+                if name in metrics:
+                    metrics[name] = max(metrics[name], float(record[key])) if key in ("peak_rss_mb", "cached") else metrics[name] + float(record[key])
+                else:
+                    metrics[name] = float(record[key])
+        return metrics
+
+    def log_to_mlflow(self, prefix="profile", run_id=None):
+        # run_id adds the profile to a finished run (the training run) instead of the active / a new one
+        import mlflow
+        if run_id is None:
+            mlflow.log_metrics(self.metrics(prefix))
+            return
+        from utils.mlflow_logger import AsyncMLflowLogger
+        with AsyncMLflowLogger(run_id, synchronous=True) as tracker:
+            tracker.log_metrics(self.metrics(prefix))
+
+# Shared instance so stages in different modules land in one profile
+profiler = StageProfiler()
+profile_stage = profiler.profile
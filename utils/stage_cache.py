@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from src.logger import get_logger
+from src.custom_exception import CustomException
+
+logger = get_logger(__name__)
+
+class StageCache:
+    def __init__(self, cache_dir, max_size_mb=2048, max_age_days=30):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.max_age_seconds = max_age_days * 24 * 3600
+        self.digest_index_path = os.path.join(cache_dir, "file_digests.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._digests = self._read_json(self.digest_index_path, {})
+
+    @staticmethod
+    def _read_json(path, default):
+        if not os.path.exists(path):
+            return default
+        with open(path) as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_json(path, data):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, path) #Atomic, an interrupted run never leaves a half written manifest
+
+    def file_digest(self, path):
+        # Content hashes are memoised on (size, mtime) so unchanged multi-GB inputs are not re-read on every run
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        cached = self._digests.get(key)
+        if cached and cached["size"] == stat.st_size and cached["mtime"] == stat.st_mtime_ns:
+            return cached["sha256"]
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(block)
+        self._digests[key] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "sha256": sha.hexdigest()}
+        self._write_json(self.digest_index_path, self._digests)
+        return sha.hexdigest()
+
+    def path_digest(self, path):
+        if os.path.isdir(path):
+            sha = hashlib.sha256()
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    file_path = os.path.join(root, name)
+                    sha.update(os.path.relpath(file_path, path).encode())
+                    sha.update(self.file_digest(file_path).encode())
+            return sha.hexdigest()
+        return self.file_digest(path)
+
+    def fingerprint(self, stage_name, inputs, config, code_files):
+        # Inputs + config section + stage source code; any change produces a new cache entry
+        payload = {
+            "stage": stage_name,
+            "inputs": {path: self.path_digest(path) for path in inputs},
+            "config": config,
+            "code": {path: self.file_digest(path) for path in code_files}
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+    def _entry_dir(self, stage_name, fingerprint):
+        return os.path.join(self.cache_dir, stage_name, fingerprint)
+
+    def _copy(self, source, target):
+        if os.path.isdir(source):
+            if os.path.exists(target):
+                shutil.rmtree(target)
+            shutil.copytree(source, target)
+        else:
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            shutil.copy2(source, target)
+
+    def restore(self, stage_name, fingerprint):
+        entry_dir = self._entry_dir(stage_name, fingerprint)
+        manifest_path = os.path.join(entry_dir, "manifest.json")
+        if not os.path.exists(manifest_path):
+            return False
+        manifest = self._read_json(manifest_path, {})
+        for index, output in enumerate(manifest["outputs"]):
+            cached_path = os.path.join(entry_dir, str(index))
+            # Only copy back outputs that are missing or were overwritten since
+            if not os.path.exists(output) or self.path_digest(output) != manifest["digests"][index]:
+                self._copy(cached_path, output)
+        manifest["last_used"] = time.time()
+        self._write_json(manifest_path, manifest)
+        return True
+
+    def store(self, stage_name, fingerprint, outputs):
+        entry_dir = self._entry_dir(stage_name, fingerprint)
+        if os.path.exists(entry_dir):
+            shutil.rmtree(entry_dir)
+        os.makedirs(entry_dir)
+        for index, output in enumerate(outputs):
+            self._copy(output, os.path.join(entry_dir, str(index)))
+        manifest = {
+            "stage": stage_name,
+            "outputs": list(outputs),
+            "digests": [self.path_digest(output) for output in outputs],
+            "created": time.time(),
+            "last_used": time.time(),
+            "size": self._dir_size(entry_dir)
+        }
+        self._write_json(os.path.join(entry_dir, "manifest.json"), manifest)
+
+    @staticmethod
+    def _dir_size(path):
+        return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+    def evict(self, keep=None):
+        # Drop entries older than max_age_days, then least recently used ones until under max_size_mb
+        entries = []
+        for stage_name in os.listdir(self.cache_dir):
+            stage_dir = os.path.join(self.cache_dir, stage_name)
+            if not os.path.isdir(stage_dir):
+                continue
+            for fingerprint in os.listdir(stage_dir):
+                manifest = self._read_json(os.path.join(stage_dir, fingerprint, "manifest.json"), None)
+                if manifest is None:
+                    shutil.rmtree(os.path.join(stage_dir, fingerprint)) #Incomplete entry from an interrupted store
+                    continue
+                entries.append((manifest["last_used"], manifest["created"], manifest["size"], os.path.join(stage_dir, fingerprint)))
+        now = time.time()
+        total_size = sum(entry[2] for entry in entries)
+        for last_used, created, size, path in sorted(entries):
+            if path == keep:
+                continue
+            if now - created > self.max_age_seconds or total_size > self.max_size_bytes:
+                shutil.rmtree(path)
+                total_size -= size
+                logger.info(f"Evicted stage cache entry {path}")
+
+    def run_stage(self, stage_name, stage_fn, inputs, outputs, config, code_files, force=False):
+        try:
+            fingerprint = self.fingerprint(stage_name, inputs, config, code_files)
+            if not force and self.restore(stage_name, fingerprint):
+                logger.info(f"Stage {stage_name} unchanged (fingerprint {fingerprint[:12]}), reusing cached outputs")
+                return False
+            logger.info(f"Running stage {stage_name} (fingerprint {fingerprint[:12]})")
+            stage_fn()
+            self.store(stage_name, fingerprint, outputs)
+            self.evict(keep=self._entry_dir(stage_name, fingerprint))
+            return True
+        except Exception as e:
+            logger.error(f"Error in cached stage {stage_name}: {e}")
+            raise CustomException(f"Failed to run stage {stage_name}", e)